@@ -21,6 +21,51 @@ class AppConfig:
     tmp_dir: Path
     assets_dir: Path
     credentials_file: Path
+    # Сколько секунд снимок листа считается свежим (см. data/snapshots.py);
+    # сколько снимков держать в памяти и предельный возраст снимка даже при неизменной ревизии.
+    sheets_cache_ttl: float
+    sheets_cache_max: int
+    sheets_cache_max_age: float
+    # Через сколько секунд список листов таблицы обновляется в фоне (см. data/metadata.py).
+    sheets_meta_ttl: float
+    # Как часто перечитывать список таблиц (новые месяцы), секунд; 0 — только при старте.
+    sheets_directory_refresh: float
+    # Проверять ревизию таблицы в Drive (см. data/revisions.py): пока она не сменилась,
+    # снимки и метаданные не перезагружаются; grace — сколько секунд верим последней проверке.
+    sheets_track_revisions: bool
+    sheets_revision_grace: float
+    # Таблица сценария «Flight Vaucher»: листы месяцев и «расписание рейсов»; None — сценарий недоступен.
+    flight_spreadsheet_id: str | None
+    # Хранить снимки листов в tmp/snapshots.sqlite, чтобы они пережили перезапуск.
+    snapshot_store: bool
+    # Пул потоков для блокирующих вызовов gspread (см. core/sheets_gateway.py).
+    sheets_workers: int
+    sheets_timeout: float
+    # Пул процессов для рендера ваучеров (см. core/voucher/pool.py).
+    render_workers: int
+    render_queue: int
+    # Как отправлять ваучеры пакета: rooms — по файлу на комнату,
+    # merged — один общий PDF, zip — архив; можно сочетать: merged+zip.
+    voucher_delivery: frozenset[str]
+    # Лимиты исходящих сообщений Telegram (см. core/telegram_queue.py):
+    # сообщений в секунду на весь бот и на один чат, запас на чат и число повторов после RetryAfter.
+    tg_global_rate: float
+    tg_chat_rate: float
+    tg_chat_burst: float
+    tg_max_retries: int
+    # Сколько первых листов месяца подгружать в фоне после выбора месяца и
+    # сколько одновременно (см. core/prefetch.py); 0 — не подгружать.
+    prefetch_sheets: int
+    prefetch_workers: int
+    # Сессии пользователей (превью, редактирование, списки листов; см. data/cache.py):
+    # сколько секунд живёт запись без обращений, сколько записей и мегабайт на хранилище.
+    session_ttl: float
+    session_max_entries: int
+    session_max_mb: float
+    # Печатать при старте, сколько времени заняли импорты модулей (см. core/startup_profile.py).
+    startup_profile: bool
+    # Запускать polling сразу, а модули обработчиков импортировать в фоне (см. core/lazy_handlers.py).
+    lazy_handlers: bool
 
     @classmethod
     def from_env(cls) -> "AppConfig":
@@ -30,6 +75,20 @@ class AppConfig:
                 "Не задан BOT_TOKEN. Добавьте его в файл .env или переменные окружения."
             )
 
+        render_workers = max(1, int(os.getenv("RENDER_WORKERS", str(os.cpu_count() or 2))))
+
+        voucher_delivery = frozenset(
+            m.strip().lower()
+            for m in os.getenv("VOUCHER_DELIVERY", "rooms").replace(",", "+").split("+")
+            if m.strip()
+        )
+        unknown = voucher_delivery - {"rooms", "merged", "zip"}
+        if unknown or not voucher_delivery:
+            raise RuntimeError(
+                f"Неверный VOUCHER_DELIVERY: {', '.join(sorted(unknown)) or 'пусто'}. "
+                "Допустимо: rooms, merged, zip (через +)."
+            )
+
         return cls(
             bot_token=bot_token,
             google_creds=os.getenv("GOOGLE_CREDS"),
@@ -41,6 +100,31 @@ class AppConfig:
                 / "credentials"
                 / "service_account.json"
             ),
+            sheets_cache_ttl=float(os.getenv("SHEETS_CACHE_TTL", "60")),
+            sheets_cache_max=max(1, int(os.getenv("SHEETS_CACHE_MAX", "64"))),
+            sheets_cache_max_age=float(os.getenv("SHEETS_CACHE_MAX_AGE", "3600")),
+            sheets_meta_ttl=float(os.getenv("SHEETS_META_TTL", "300")),
+            sheets_directory_refresh=float(os.getenv("SHEETS_DIRECTORY_REFRESH", "600")),
+            sheets_track_revisions=os.getenv("SHEETS_TRACK_REVISIONS", "1").strip().lower() not in ("0", "false", "no", ""),
+            sheets_revision_grace=float(os.getenv("SHEETS_REVISION_GRACE", "10")),
+            flight_spreadsheet_id=os.getenv("FLIGHT_SPREADSHEET_ID", "").strip() or None,
+            snapshot_store=os.getenv("SNAPSHOT_STORE", "1").strip().lower() not in ("0", "false", "no", ""),
+            sheets_workers=int(os.getenv("SHEETS_WORKERS", "8")),
+            sheets_timeout=float(os.getenv("SHEETS_TIMEOUT", "30")),
+            render_workers=render_workers,
+            render_queue=int(os.getenv("RENDER_QUEUE", str(render_workers * 2))),
+            voucher_delivery=voucher_delivery,
+            tg_global_rate=float(os.getenv("TG_GLOBAL_RATE", "30")),
+            tg_chat_rate=float(os.getenv("TG_CHAT_RATE", "1")),
+            tg_chat_burst=float(os.getenv("TG_CHAT_BURST", "3")),
+            tg_max_retries=int(os.getenv("TG_MAX_RETRIES", "3")),
+            prefetch_sheets=int(os.getenv("PREFETCH_SHEETS", "8")),
+            prefetch_workers=max(1, int(os.getenv("PREFETCH_WORKERS", "2"))),
+            session_ttl=float(os.getenv("SESSION_TTL", str(6 * 3600))),
+            session_max_entries=max(1, int(os.getenv("SESSION_MAX_ENTRIES", "500"))),
+            session_max_mb=float(os.getenv("SESSION_MAX_MB", "64")),
+            startup_profile=os.getenv("STARTUP_PROFILE", "0").strip().lower() in ("1", "true", "yes"),
+            lazy_handlers=os.getenv("LAZY_HANDLERS", "1").strip().lower() not in ("0", "false", "no", ""),
         )
 
 
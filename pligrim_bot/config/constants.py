@@ -29,9 +29,16 @@ TTF_MEDIUM = os.path.join(FONTS_DIR, "Montserrat-Medium.ttf")
 
 print(f" REGULAR exists: {os.path.exists(TTF_REGULAR)}   → {TTF_REGULAR}")
 
-# Инициализация бота
-bot = Bot(token=API_TOKEN)
+# Инициализация бота: Bot создаём при старте polling (get_bot), а не при импорте —
+# модули с константами можно импортировать без сети и без проверки токена
 dp = Dispatcher()
+_bot: Bot | None = None
+
+def get_bot() -> Bot:
+    global _bot
+    if _bot is None:
+        _bot = Bot(token=API_TOKEN)
+    return _bot
 
 # --- Исключения ---
 EXCLUDE_SHEETS = [
@@ -108,10 +115,8 @@ NEXT_PACKAGE_HINT = re.compile(
 
 
 # === PREVIEW / EDIT STATE ===
-from typing import Dict
-
-PREVIEW_CACHE: Dict[str, dict] = {}  # cache_id -> {"voucher":..., "pkg_title":..., "page2_png":...}
-EDIT_STATE: Dict[int, dict] = {}     # user_id -> {"cache_id":..., "field":...}
+# Хранилища с TTL и LRU-вытеснением (см. data/cache.py)
+from pligrim_bot.data.cache import PREVIEW_CACHE, EDIT_STATE
 
 
 # === 2. ОТРИСОВКА СТР.1 =========================================
@@ -2,7 +2,7 @@ import re
 from datetime import datetime
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from .constants import MONTHS_RU, PREVIEW_CACHE
-from .settings import PALM_SHEETS
+from .settings import palm_sheets, sheets_ready
 from ..core.google_sheets import get_palm_sheet_names
 from ..core.utils.text_utils import safe_cb_text
 from ..core.utils.validation import city_ru
@@ -139,11 +139,23 @@ def extract_start_date(title):
     return datetime.min
 
 
+def warming_up_kb() -> InlineKeyboardMarkup:
+    """Список таблиц ещё загружается после старта — даём только кнопку 'Обновить'."""
+    return InlineKeyboardMarkup(inline_keyboard=[
+        [InlineKeyboardButton(text="⏳ Таблицы загружаются… Обновить", callback_data="get_month_buttons")]
+    ])
+
 def get_palm_month_buttons() -> InlineKeyboardMarkup:
-    """Кнопки выбора месяца (по PALM_SHEETS)."""
-    rows = [[InlineKeyboardButton(text=mk, callback_data=f"palm_month:{mk}")] for mk in PALM_SHEETS.keys()]
+    """Кнопки выбора месяца (по palm_sheets())."""
+    if not sheets_ready():
+        return warming_up_kb()
+    rows = [[InlineKeyboardButton(text=mk, callback_data=f"palm_month:{mk}")] for mk in palm_sheets().keys()]
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
+# Сколько листов месяца показываем до кнопки "Показать все"
+PALM_SHEETS_PAGE = 8
+NO_PALM_SHEETS = "— нет актуальных листов —"
+
 def get_palm_sheet_buttons(month_key: str, show_all=False) -> InlineKeyboardMarkup:
     """
     Кнопки листов для выбранного месяца с фильтрацией 'прошедших' по дате и пагинацией.
@@ -152,11 +164,11 @@ def get_palm_sheet_buttons(month_key: str, show_all=False) -> InlineKeyboardMark
         names = get_palm_sheet_names(month_key, include_past=False)
 
         if not names:
-            names = ["— нет актуальных листов —"]
+            names = [NO_PALM_SHEETS]
 
         # Ограничиваем показ если не показаны все
-        if not show_all and len(names) > 8:
-            display_names = names[:8]
+        if not show_all and len(names) > PALM_SHEETS_PAGE:
+            display_names = names[:PALM_SHEETS_PAGE]
             has_more = True
         else:
             display_names = names
@@ -190,18 +202,32 @@ def get_palm_sheet_buttons(month_key: str, show_all=False) -> InlineKeyboardMark
         ])
         return error_kb, []
 
-def build_palm_packages_kb(month_key: str, ws_title: str, packages: list[dict]) -> InlineKeyboardMarkup:
+def build_palm_packages_kb(month_key: str, ws_title: str, packages: list[dict],
+                           parsed: dict[int, dict | None] | None = None) -> InlineKeyboardMarkup:
     # callback запоминаем позицию найденного заголовка (row),
     # пригодится для дальнейшего парсинга конкретного пакета
     rows = [
         [InlineKeyboardButton(
-            text=p["title"],
+            text=package_button_text(p["title"], (parsed or {}).get(p["row"])),
             callback_data=f"palm_pkg:{month_key}:{ws_title}:{p['row']}"
         )]
         for p in packages
     ]
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
+def package_button_text(title: str, voucher: dict | None) -> str:
+    """Название пакета + число паломников и отели, если пакет уже разобран."""
+    if not voucher:
+        return title
+    parts = [title]
+    pax = len(voucher.get("_people_flat") or [])
+    if pax:
+        parts.append(f"👥 {pax}")
+    hotels = [str(h)[:18] for h in (voucher.get("hotel1"), voucher.get("hotel2")) if h and h != "—"]
+    if hotels:
+        parts.append("🏨 " + " / ".join(hotels))
+    return " · ".join(parts)
+
 def build_package_keyboard(sheet_name, packages):
     """Создаёт кнопки для найденных пакетов"""
     return InlineKeyboardMarkup(
@@ -1,7 +1,9 @@
 import json
+import threading
+import time
+from types import MappingProxyType
+from typing import Mapping
 
-import gspread
-from google.oauth2.service_account import Credentials
 import os
 import re
 from datetime import datetime
@@ -13,8 +15,6 @@ print(f" Инициализация Google Sheets...")
 # Глобальные переменные
 _client = None
 _spreadsheet = None
-ALL_SHEETS = {}
-PALM_SHEETS = {}
 
 # Временный ручной фильтр для скрытия конкретных таблиц паломников.
 # Формат: "Month YYYY" как в логах detect_pilgrim_months.
@@ -29,6 +29,10 @@ def get_google_client():
     if _client is not None:
         return _client
 
+    # gspread и google-auth тяжёлые — грузим при первом подключении, а не при старте бота
+    import gspread
+    from google.oauth2.service_account import Credentials
+
     try:
         creds = None
         # 1. Читаем JSON из .env или переменных окружения сервера.
@@ -54,6 +58,8 @@ def get_google_client():
             return None
 
         _client = gspread.authorize(creds)
+        # вызовы идут из пула потоков (core/sheets_gateway.py) — не даём им висеть бесконечно
+        _client.set_timeout(config.sheets_timeout)
         print(" Успешное подключение к Google")
         return _client
 
@@ -61,10 +67,8 @@ def get_google_client():
         print(f" Критическая ошибка подключения: {e}")
         return None
 
-# Глобальный клиент
-client = get_google_client()
-
 def get_all_accessible_sheets():
+    client = get_google_client()
     if not client: return {}
     try:
         return {s.title: s.id for s in client.openall()}
@@ -72,12 +76,7 @@ def get_all_accessible_sheets():
         print(f"Ошибка списка таблиц: {e}")
         return {}
 
-def refresh_sheets():
-    # Ваша логика обновления
-    print("Обновление списка таблиц...")
-    get_all_accessible_sheets()
-
-def detect_pilgrim_months(sheets):
+def detect_pilgrim_months(sheets, verbose=True):
     """Автоматически определяет таблицы паломников по названиям месяцев"""
     month_pattern = r'\b(january|february|march|april|may|june|july|august|september|october|november|december)\b'
     year_pattern = r'\b(20\d{2})\b'
@@ -98,61 +97,122 @@ def detect_pilgrim_months(sheets):
 
             key = f"{month} {year}"
             if key in EXCLUDED_PILGRIM_MONTHS:
-                print(f" Пропускаю таблицу паломников: {key}")
+                if verbose:
+                    print(f" Пропускаю таблицу паломников: {key}")
                 continue
 
             pilgrim_sheets[key] = sheet_id
-            print(f" Обнаружена таблица паломников: {key}")
+            if verbose:
+                print(f" Обнаружена таблица паломников: {key}")
 
     return pilgrim_sheets
 
-# ДИНАМИЧЕСКОЕ ПОЛУЧЕНИЕ ТАБЛИЦ ПРИ ЗАПУСКЕ
-print(" Получаем доступные таблицы...")
-ALL_SHEETS = get_all_accessible_sheets()
-PALM_SHEETS = detect_pilgrim_months(ALL_SHEETS)
-
-print(f" Итог: найдено {len(PALM_SHEETS)} таблиц паломников")
-
-def refresh_sheets():
+class SheetsDirectory:
+    """
+    Список доступных таблиц: все (название → id) и таблицы паломников (месяц → id).
+    Обновление собирает новые словари и подменяет их одной ссылкой — читатели
+    видят либо старый список, либо новый, но не наполовину обновлённый.
+    Хендлеры читают его через all_sheets() / palm_sheets(), а не импортом по значению.
+    """
+
+    def __init__(self):
+        self._all: Mapping[str, str] = MappingProxyType({})
+        self._palm: Mapping[str, str] = MappingProxyType({})
+        self._ready = threading.Event()
+        self._refresh_lock = threading.Lock()
+        self.refreshed_at: float | None = None
+
+    @property
+    def all_sheets(self) -> Mapping[str, str]:
+        return self._all
+
+    @property
+    def palm_sheets(self) -> Mapping[str, str]:
+        return self._palm
+
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def refresh(self) -> bool:
+        """
+        Перечитывает список таблиц. Если ничего не изменилось — словари не трогаем,
+        иначе меняем целиком и пишем в лог, что добавилось и что пропало.
+        False — Google недоступен, остаётся прежний список.
+        """
+        with self._refresh_lock:
+            first = not self.ready()
+            if first:
+                print(" Получаем доступные таблицы...")
+            all_sheets = get_all_accessible_sheets()
+            if not all_sheets:
+                return False
+
+            palm_sheets = detect_pilgrim_months(all_sheets, verbose=first)
+            self.refreshed_at = time.monotonic()
+
+            if all_sheets != self._all or palm_sheets != self._palm:
+                if not first:
+                    added = sorted(palm_sheets.keys() - self._palm.keys())
+                    removed = sorted(self._palm.keys() - palm_sheets.keys())
+                    print(f" Список таблиц изменился: всего {len(all_sheets)}; "
+                          f"месяцы +{added or '—'} −{removed or '—'}")
+                self._all = MappingProxyType(dict(all_sheets))
+                self._palm = MappingProxyType(dict(palm_sheets))
+
+            if first:
+                print(f" Итог: найдено {len(palm_sheets)} таблиц паломников")
+            self._ready.set()
+            return True
+
+
+sheets_directory = SheetsDirectory()
+
+def all_sheets() -> Mapping[str, str]:
+    return sheets_directory.all_sheets
+
+def palm_sheets() -> Mapping[str, str]:
+    """Месяц → id таблицы паломников (текущий список; после обновления — новый)."""
+    return sheets_directory.palm_sheets
+
+def sheets_ready() -> bool:
+    return sheets_directory.ready()
+
+def refresh_sheets() -> bool:
     """Обновляет список таблиц"""
-    global ALL_SHEETS, PALM_SHEETS, client
-    ALL_SHEETS = get_all_accessible_sheets()
-    PALM_SHEETS = detect_pilgrim_months(ALL_SHEETS)
-    print(f" Обновлено! Доступно таблиц паломников: {len(PALM_SHEETS)}")
+    return sheets_directory.refresh()
 
 def get_worksheet(month_key: str, sheet_name: str):
     """Получает конкретный лист из таблицы по месяцу и названию листа"""
-    global client
-    if not client:
-        client = get_google_client()
-
+    client = get_google_client()
     if not client:
         return None
 
     try:
-        if month_key not in PALM_SHEETS:
+        months = palm_sheets()
+        if month_key not in months:
             print(f" Таблица для месяца {month_key} не найдена")
-            print(f" Доступные месяцы: {list(PALM_SHEETS.keys())}")
+            print(f" Доступные месяцы: {list(months.keys())}")
             return None
 
-        spreadsheet_id = PALM_SHEETS[month_key]
-        spreadsheet = client.open_by_key(spreadsheet_id)
+        # метаданные таблицы берём из общего кэша, без open_by_key на каждый вызов
+        from pligrim_bot.data.metadata import metadata_registry
+
+        meta = metadata_registry.get(months[month_key])
 
         # Пробуем найти лист
-        try:
-            worksheet = spreadsheet.worksheet(sheet_name)
+        worksheet = meta.by_title.get(sheet_name)
+        if worksheet is not None:
             print(f" Лист найден: {sheet_name} в {month_key}")
             return worksheet
-        except Exception as e:
-            print(f" Лист {sheet_name} не найден в {month_key}: {e}")
 
-            # Покажем доступные листы
-            worksheets = spreadsheet.worksheets()
-            print(f" Доступные листы в {month_key}:")
-            for ws in worksheets:
-                print(f"    {ws.title}")
+        print(f" Лист {sheet_name} не найден в {month_key}")
 
-            return None
+        # Покажем доступные листы
+        print(f" Доступные листы в {month_key}:")
+        for title in meta.titles:
+            print(f"    {title}")
+
+        return None
 
     except Exception as e:
         print(f" Ошибка получения листа {sheet_name} из {month_key}: {e}")
@@ -1,11 +1,12 @@
-import difflib
 import re
 from datetime import datetime, date
-from gspread import WorksheetNotFound
 
-from pligrim_bot.config.settings import PALM_SHEETS, get_google_client
+from pligrim_bot.config.app_config import config
+from pligrim_bot.config.settings import palm_sheets
 from pligrim_bot.core.utils.date_utils import norm_date_str
-from pligrim_bot.core.utils.text_utils import norm_title
+from pligrim_bot.core.utils.matcher import AliasMatcher
+from pligrim_bot.data.metadata import metadata_registry
+from pligrim_bot.data.snapshots import sheet_values
 
 DDMM_RE = re.compile(r'(\d{1,2})\.(\d{1,2})')
 
@@ -17,33 +18,28 @@ def get_palm_sheet_names(month_key: str, *, include_past: bool = False) -> list[
     - листы без даты считаем служебными — показываем всегда.
     """
     try:
-        if month_key not in PALM_SHEETS:
-            print(f" Месяц {month_key} не найден в PALM_SHEETS")
+        months = palm_sheets()
+        if month_key not in months:
+            print(f" Месяц {month_key} не найден в списке таблиц паломников")
             return []
 
-        sheet_id = PALM_SHEETS[month_key]
-        client = get_google_client()
-        if not client:
-            print(" Google Sheets клиент не доступен")
-            return []
-
-        ss = client.open_by_key(sheet_id)
+        meta = metadata_registry.get(months[month_key])
         base_year = resolve_base_year(month_key, datetime.now().year)
         today = datetime.now().date()
 
         result = []
-        for ws in ss.worksheets():
-            ddmm = parse_first_ddmm(ws.title)
+        for title in meta.titles:
+            ddmm = parse_first_ddmm(title)
             if ddmm is None:
                 # лист без даты — показываем (часто это инфо/шаблоны)
-                result.append(ws.title)
+                result.append(title)
                 continue
 
             d, mth = ddmm
             try:
                 sheet_date = date(base_year, mth, d)
                 if include_past or sheet_date >= today:
-                    result.append(ws.title)
+                    result.append(title)
             except ValueError:
                 continue
 
@@ -69,13 +65,7 @@ def get_palm_sheet_names(month_key: str, *, include_past: bool = False) -> list[
 def get_sheet_titles_by_id(spreadsheet_id: str) -> list[str]:
     """Получает названия всех листов в документе по ID"""
     try:
-        client = get_google_client()
-        if not client:
-            return []
-
-        sheet = client.open_by_key(spreadsheet_id)
-        worksheet_titles = [ws.title for ws in sheet.worksheets()]
-        return worksheet_titles
+        return metadata_registry.get(spreadsheet_id).titles
     except Exception as e:
         print(f" Ошибка получения листов для {spreadsheet_id}: {e}")
         return []
@@ -100,27 +90,34 @@ def resolve_base_year(month_key: str, fallback_year: int | None = None) -> int:
 def find_worksheet_by_title(ss, wanted_title: str):
     """Ищет лист по названию, терпимо к пробелам/вариантам написания.
     Возвращает gspread.Worksheet или кидает WorksheetNotFound.
+    Список листов берётся из кэша метаданных, а не из ss.worksheets().
+    """
+    return metadata_registry.worksheet(ss.id, wanted_title)
+
+def get_palm_worksheet(month_key: str, ws_title: str):
+    """
+    Лист паломников по месяцу и названию без повторного open_by_key.
+    None — список таблиц ещё не загружен или месяца в нём больше нет.
+    """
+    ss = palm_sheets().get(month_key)
+    if ss is None:
+        return None
+    return metadata_registry.worksheet(ss, ws_title)
+
+def get_flight_sheet_titles() -> list[str]:
+    """Листы таблицы рейсов (FLIGHT_SPREADSHEET_ID) из кэша метаданных; [] — таблица не задана."""
+    if not config.flight_spreadsheet_id:
+        return []
+    return metadata_registry.get(config.flight_spreadsheet_id).titles
+
+def get_flight_worksheet(ws_title: str):
+    """
+    Лист таблицы рейсов по названию.
+    None — FLIGHT_SPREADSHEET_ID не задан; нет такого листа — WorksheetNotFound.
     """
-    # 1) точное совпадение
-    for ws in ss.worksheets():
-        if ws.title == wanted_title:
-            return ws
-
-    # 2) нормализованное совпадение
-    want = norm_title(wanted_title)
-    candidates = ss.worksheets()
-    for ws in candidates:
-        if norm_title(ws.title) == want:
-            return ws
-
-    # 3) fuzzy fallback (на всякий случай)
-    titles = [ws.title for ws in candidates]
-    guess = difflib.get_close_matches(wanted_title, titles, n=1, cutoff=0.65)
-    if guess:
-        print(f"[WARN] Worksheet '{wanted_title}' not found, using close match '{guess[0]}'")
-        return ss.worksheet(guess[0])
-
-    raise WorksheetNotFound(wanted_title)
+    if not config.flight_spreadsheet_id:
+        return None
+    return metadata_registry.worksheet(config.flight_spreadsheet_id, ws_title)
 
 def token_from_schedule(dep: str, ret: str,
                         OUT_AJ: dict, OUT_AM: dict,
@@ -138,27 +135,17 @@ def token_from_schedule(dep: str, ret: str,
     # "AMMA" у нас не используется для пакетов 7 дней
     return None
 
+# Порядок важен: при нескольких городах в ячейке побеждает первый
+CITY_ANY_MATCHER = AliasMatcher({
+    "madinah": ("madinah", "medina", "madina", "медин", "медина"),
+    "makkah": ("makkah", "mecca", "мекка", "макка"),
+    "jeddah": ("jeddah", "jedda", "джедд", "джидд"),
+    "alula": ("alula", "al-ula", "аль-ула", "алула"),
+})
+
 def match_city_any(cell: str) -> str | None:
     """Определяет город по тексту ячейки"""
-    s = (cell or "").lower()
-
-    # Мадина
-    if any(a in s for a in ("madinah", "medina", "madina", "медин", "медина")):
-        return "madinah"
-
-    # Мекка
-    if any(a in s for a in ("makkah", "mecca", "мекка", "макка")):
-        return "makkah"
-
-    # Джедда
-    if any(a in s for a in ("jeddah", "jedda", "джедд", "джидд")):
-        return "jeddah"
-
-    # Аль-Ула
-    if any(a in s for a in ("alula", "al-ula", "аль-ула", "алула")):
-        return "alula"
-
-    return None
+    return CITY_ANY_MATCHER.first((cell or "").lower())
 
 def get_worksheet_data(worksheet, range_name: str = None):
     """Получает данные с листа"""
@@ -166,7 +153,7 @@ def get_worksheet_data(worksheet, range_name: str = None):
         if range_name:
             return worksheet.get(range_name)
         else:
-            return worksheet.get_all_values()
+            return sheet_values(worksheet)
     except Exception as e:
         print(f" Ошибка получения данных с листа {worksheet.title}: {e}")
         return []
@@ -0,0 +1,63 @@
+import asyncio
+import importlib
+import time
+
+from aiogram import BaseMiddleware
+
+# Модули, которые регистрируют обработчики на dp декораторами @dp...
+HANDLER_MODULES = (
+    "pligrim_bot.handlers.flight_handlers",
+    "pligrim_bot.handlers.pilgrim_handlers",
+    "pligrim_bot.handlers.preview_handlers",
+    "pligrim_bot.handlers.debug_handlers",
+    "pligrim_bot.handlers.palm_edit_handlers",
+    "pligrim_bot.handlers.palm_restart_handlers",
+    "pligrim_bot.handlers.indv_voucher_handlers",
+)
+
+# Типы апдейтов, на которые есть обработчики. При ленивой загрузке aiogram
+# не может вычислить их сам: к старту polling обработчиков ещё нет.
+ALLOWED_UPDATES = ["message", "callback_query"]
+
+
+def import_handlers() -> float:
+    """Импортирует модули обработчиков (они сами регистрируются на dp). Возвращает время в секундах."""
+    t0 = time.perf_counter()
+    for name in HANDLER_MODULES:
+        importlib.import_module(name)
+    return time.perf_counter() - t0
+
+
+class LazyHandlers(BaseMiddleware):
+    """
+    Ленивая регистрация обработчиков: polling стартует сразу, а модули handlers/
+    (и с ними парсеры, Pillow, gspread) импортируются в фоновом потоке.
+    Как внешний middleware на dp.update держит апдейты, пока импорт не закончится.
+    """
+
+    def __init__(self, on_loaded=None):
+        self.on_loaded = on_loaded
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._load())
+
+    async def _load(self) -> None:
+        try:
+            took = await asyncio.to_thread(import_handlers)
+        except Exception as e:
+            print(f" Ошибка импорта обработчиков: {e}")
+            raise
+        print(f" Обработчики загружены в фоне за {took:.2f} c")
+        if self.on_loaded is not None:
+            self.on_loaded()
+
+    async def ready(self) -> None:
+        self.start()
+        # shield: отмена одного апдейта не должна отменять общий импорт
+        await asyncio.shield(self._task)
+
+    async def __call__(self, handler, event, data):
+        await self.ready()
+        return await handler(event, data)
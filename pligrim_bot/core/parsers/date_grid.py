@@ -0,0 +1,109 @@
+import threading
+from collections import OrderedDict
+from datetime import date
+
+from pligrim_bot.config.constants import DATE_ANY, DATE_ISO
+from pligrim_bot.core.utils.date_utils import norm_date
+
+
+def _to_date(d: str, m: str, y: str) -> date | None:
+    y = ("20" + y) if len(y) == 2 else y
+    if len(y) != 4:
+        return None
+    try:
+        return date(int(y), int(m), int(d))
+    except ValueError:
+        return None
+
+
+class DateGrid:
+    """
+    Даты листа, разобранные за один проход по ячейкам:
+      tokens[(r, c)]    — даты ячейки как их находит DATE_ANY: [(dd, mm, yy)];
+      cell_norm[(r, c)] — дата ячейки так, как её видит norm_date ('dd.mm.yyyy');
+      cell_date[(r, c)] — она же как date (только существующие даты);
+      by_cell_date      — обратный индекс: дата → ячейки [(r, c)];
+      by_day_month      — обратный индекс по дню и месяцу из tokens (год не важен) → строки;
+      row_span[r]       — первые две даты строки, как их берёт as_ddmmYYYY_pair;
+                          None — если дата не существует (31.02).
+    """
+
+    def __init__(self, data: list[list[str]]):
+        self.tokens: dict[tuple[int, int], list[tuple[str, str, str]]] = {}
+        self.cell_norm: dict[tuple[int, int], str] = {}
+        self.cell_date: dict[tuple[int, int], date] = {}
+        self.by_cell_date: dict[date, list[tuple[int, int]]] = {}
+        self.by_day_month: dict[tuple[int, int], set[int]] = {}
+        self.row_span: dict[int, tuple[date | None, date | None]] = {}
+
+        for r, row in enumerate(data):
+            any_tokens, iso_tokens = [], []
+            for c, raw in enumerate(row):
+                s = str(raw or "")
+                # в любой дате есть разделитель — остальные ячейки не трогаем
+                if "." not in s and "/" not in s and "-" not in s:
+                    continue
+
+                found = DATE_ANY.findall(s)
+                if found:
+                    self.tokens[(r, c)] = found
+                    any_tokens += found
+                    for dd, mm, _ in found:
+                        self.by_day_month.setdefault((int(dd), int(mm)), set()).add(r)
+                iso_tokens += DATE_ISO.findall(s)
+
+                nd = norm_date(s)
+                if nd:
+                    self.cell_norm[(r, c)] = nd
+                    d = _to_date(*nd.split("."))
+                    if d:
+                        self.cell_date[(r, c)] = d
+                        self.by_cell_date.setdefault(d, []).append((r, c))
+
+            if len(any_tokens) >= 2:
+                self.row_span[r] = (_to_date(*any_tokens[0]), _to_date(*any_tokens[1]))
+            elif len(iso_tokens) >= 2:
+                (y1, m1, d1), (y2, m2, d2) = iso_tokens[:2]
+                self.row_span[r] = (_to_date(d1, m1, y1), _to_date(d2, m2, y2))
+
+    def tokens_in(self, r: int, c0: int, c1: int) -> list[tuple[str, str, str]]:
+        """Даты ячеек строки r в колонках [c0; c1) по порядку — как DATE_ANY по склеенным ячейкам."""
+        out = []
+        for c in range(c0, c1):
+            out += self.tokens.get((r, c), ())
+        return out
+
+    def rows_with_cell_date(self, d: date) -> set[int]:
+        return {r for r, _ in self.by_cell_date.get(d, ())}
+
+    def rows_with_day_month(self, day: int, month: int) -> set[int]:
+        """Строки, где DATE_ANY находит дату этого дня и месяца (любого года, даже несуществующую)."""
+        return self.by_day_month.get((day, month), set())
+
+
+# Сетки последних листов. data — общий список из снимка (data/snapshots.py),
+# поэтому новый снимок — новый объект и новая сетка.
+_grids: OrderedDict[int, DateGrid] = OrderedDict()
+_data_refs: dict[int, list] = {}
+_lock = threading.Lock()
+_MAX_GRIDS = 32
+
+
+def date_grid(data: list[list[str]]) -> DateGrid:
+    """Сетка дат листа; строится один раз на снимок."""
+    key = id(data)
+    with _lock:
+        grid = _grids.get(key)
+        if grid is not None and _data_refs.get(key) is data:
+            _grids.move_to_end(key)
+            return grid
+
+    grid = DateGrid(data)
+    with _lock:
+        _grids[key] = grid
+        _data_refs[key] = data
+        _grids.move_to_end(key)
+        while len(_grids) > _MAX_GRIDS:
+            old, _ = _grids.popitem(last=False)
+            _data_refs.pop(old, None)
+    return grid
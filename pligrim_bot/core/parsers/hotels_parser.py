@@ -1,10 +1,18 @@
 
 from datetime import datetime
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    # только для аннотаций — gspread грузится при первом обращении к Google
+    import gspread
 
 from pligrim_bot.config.constants import *
+from pligrim_bot.core.parsers.date_grid import date_grid
 from pligrim_bot.core.utils.date_utils import _parse_start_end
-from pligrim_bot.core.utils.text_utils import norm_pkg, norm_title, n, lc
+from pligrim_bot.core.utils.text_utils import norm_forms, norm_pkg, norm_title, n, lc
 from pligrim_bot.core.utils.validation import canon_family
+from pligrim_bot.data.metadata import metadata_registry
+from pligrim_bot.data.snapshots import load_snapshots, sheet_heads, sheet_values
 import re
 
 _HOTELS_HINTS = ("hotel","hotels","отель","отели","размещение","accommodation")
@@ -66,7 +74,7 @@ def extract_hotels_rows_for_package(ws_hotels, package_title: str):
     """
     Ищем на листе ОТЕЛЕЙ два блока (Медина/Мекка) для конкретного пакета.
     """
-    data = ws_hotels.get_all_values()
+    data = sheet_values(ws_hotels)
     if not data:
         print(" Лист отелей пустой")
         return []
@@ -81,10 +89,16 @@ def extract_hotels_rows_for_package(ws_hotels, package_title: str):
 
     print(f" Даты пакета: {pkg_dates}")
 
-    H = len(data)
     all_candidates = []
 
-    for rr in range(H):
+    # даты строк уже разобраны в сетке: город и отель ищем только там,
+    # где пара дат подходит к пакету
+    grid = date_grid(data)
+    for rr in sorted(grid.row_span):
+        start, end = grid.row_span[rr]
+        if not _span_matches_package(start, end, pkg_dates):
+            continue
+
         row = data[rr]
         row_text = " ".join(str(cell) for cell in row).lower()
 
@@ -118,14 +132,6 @@ def extract_hotels_rows_for_package(ws_hotels, package_title: str):
         raw_text = " ".join(str(cell) for cell in row)
         d1, d2 = as_ddmmYYYY_pair(raw_text)
 
-        # ПРОВЕРЯЕМ СОВПАДЕНИЕ ДАТ С ПАКЕТОМ
-        if not (d1 and d2):
-            continue
-
-        # Сравниваем даты отеля с датами пакета
-        if not _dates_match_package(d1, d2, pkg_dates):
-            continue
-
         if not (hotel and d1 and d2):
             continue
 
@@ -186,25 +192,17 @@ def _extract_dates_from_package_title(package_title: str) -> tuple:
     except ValueError:
         return None
 
-def _dates_match_package(hotel_start: str, hotel_end: str, pkg_dates: tuple) -> bool:
+def _span_matches_package(hotel_start, hotel_end, pkg_dates: tuple) -> bool:
     """
-    Проверяет, совпадают ли даты отеля с датами пакета
+    Совпадают ли даты отеля (DateGrid.row_span) с датами пакета:
+    отель внутри пакета или заезд в пределах ±2 дней от начала.
     """
-    if not pkg_dates:
+    if not (hotel_start and hotel_end and pkg_dates):
         return False
 
-    pkg_start, pkg_end = pkg_dates
-
-    try:
-        # Парсим даты отеля
-        hotel_start_dt = datetime.strptime(hotel_start, "%d/%m/%Y")
-        hotel_end_dt = datetime.strptime(hotel_end, "%d/%m/%Y")
-
-        # Проверяем пересечение дат
-        return (hotel_start_dt >= pkg_start and hotel_end_dt <= pkg_end) or \
-            (abs((hotel_start_dt - pkg_start).days) <= 2)  # допуск +/- 2 дня
-    except Exception:
-        return False
+    pkg_start, pkg_end = (d.date() for d in pkg_dates)
+    return (hotel_start >= pkg_start and hotel_end <= pkg_end) or \
+        (abs((hotel_start - pkg_start).days) <= 2)  # допуск +/- 2 дня
 
 def payload_from_hotels_sheet(ss, package_title: str):
     """
@@ -217,6 +215,12 @@ def payload_from_hotels_sheet(ss, package_title: str):
     hotel_ws_list = find_hotels_sheets(ss)
     tried = []
 
+    # все листы отелей — одним batchGet, дальше парсеры берут их из снимков
+    try:
+        load_snapshots(ss, hotel_ws_list)
+    except Exception as e:
+        print(f" batchGet листов отелей не удался, грузим по одному: {e}")
+
     def _try(ws) -> dict | None:
         tried.append(ws.title)
         blocks = extract_hotels_rows_for_package(ws, package_title)  # см. п.4 — там теперь same_family
@@ -262,56 +266,59 @@ def payload_from_hotels_sheet(ss, package_title: str):
 
     return None
 
-def find_hotels_sheets(ss) -> list[gspread.Worksheet]:
+def find_hotels_sheets(ss) -> list["gspread.Worksheet"]:
     """Вернёт все листы, которые похожи на 'отели/размещение'."""
     out = []
-    for ws in ss.worksheets():
+    for ws in metadata_registry.get(ss.id).worksheets:
         t = (ws.title or "").strip()
         if HOTELS_TITLE_RE.search(t):
             out.append(ws)
     return out
 
-def similar_hotels_sheets(ss) -> list[gspread.Worksheet]:
+def similar_hotels_sheets(ss) -> list["gspread.Worksheet"]:
     """
     Если точных 'Hotels' нет или пакет не найден, берём верхние листы,
     где в первых строках встречаются города/даты — как 'похожие'.
     """
     cands = []
-    for ws in ss.worksheets()[:6]:
-        try:
-            vals = ws.get_all_values()[:12]
-        except Exception:
-            continue
+    sheets = metadata_registry.get(ss.id).worksheets[:6]
+    try:
+        heads = sheet_heads(ss, sheets, rows=12, cols=6)
+    except Exception:
+        return cands
+    for ws, vals in zip(sheets, heads):
         blob = " ".join(" ".join(r[:6]) for r in vals).lower()
         if (any(k in blob for k in ("madinah","medina","madina","медин","медина","makkah","mecca","мекк","макк"))
                 and re.search(r"\d{1,2}[./-]\d{1,2}([./-]\d{2,4})?", blob)):
             cands.append(ws)
     return cands
 
-def find_hotels_worksheet(ss) -> gspread.Worksheet | None:
+def find_hotels_worksheet(ss) -> "gspread.Worksheet | None":
     # 1) точные/частичные совпадения
-    for ws in ss.worksheets():
+    worksheets = metadata_registry.get(ss.id).worksheets
+    for ws in worksheets:
         t = (ws.title or "").strip().lower().replace("\xa0", " ").replace("\u202f", " ")
         if any(h in t for h in HOTELS_NAME_HINTS):
             return ws
 
     # 2) самый верхний лист, у которого в первых двух колонках встречаются города/даты
-    for ws in ss.worksheets()[:5]:
-        try:
-            vals = ws.get_all_values()[:10]
-        except Exception:
-            continue
+    sheets = worksheets[:5]
+    try:
+        heads = sheet_heads(ss, sheets, rows=10, cols=3)
+    except Exception:
+        return None
+    for ws, vals in zip(sheets, heads):
         text = " ".join(" ".join(r[:3]) for r in vals).lower()
         if any(c in text for c in ("madinah","medina","makkah","mecca","медин","макк")) and re.search(r"\d{1,2}[./-]\d{1,2}", text):
             return ws
     return None
 
 def norm_spaces(s: str) -> str:
-    return re.sub(r'[\s\u00A0\u202F]+', ' ', (s or '')).strip()
+    return norm_forms(s or "").spaces
 
 
 # ---- извлекаем из листа ОТЕЛЕЙ одну “конфигурацию” по имени пакета ----
-def extract_hotels_config(ws_hotels: gspread.Worksheet, package_title: str, city_col=None) -> dict | None:
+def extract_hotels_config(ws_hotels: "gspread.Worksheet", package_title: str, city_col=None) -> dict | None:
     """
     Ищет строку(и) для пакета в листе отелей.
     Ожидаемый формат: в колонке B ('packages') названия пакетов,
@@ -323,7 +330,7 @@ def extract_hotels_config(ws_hotels: gspread.Worksheet, package_title: str, city
       }
     либо None, если пакет не найден.
     """
-    data = ws_hotels.get_all_values()
+    data = sheet_values(ws_hotels)
     if not data:
         return None
 
@@ -441,7 +448,7 @@ def extract_city_block_from_hotels(ws_hotels, package_title: str):
       - рядом по строкам встречаются строки с городом, отелем и двумя датами.
     Возвращает dict с hotel/when по двум городам или None, если не нашли.
     """
-    data = ws_hotels.get_all_values()
+    data = sheet_values(ws_hotels)
     if not data:
         return None
 
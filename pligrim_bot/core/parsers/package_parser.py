@@ -1,6 +1,11 @@
 from pligrim_bot.core.parsers.people_parser import *
+from pligrim_bot.core.parsers.date_grid import date_grid
+from pligrim_bot.core.parsers.sheet_index import TABLE_HEADER_KEYWORDS, SheetIndex, sheet_index
 from pligrim_bot.core.parsers.transport_parser import collect_transport
+from pligrim_bot.core.utils.matcher import AliasMatcher, words_matcher
 from pligrim_bot.core.utils.text_utils import *
+from pligrim_bot.data.snapshots import SheetSnapshot, get_snapshot
+import copy
 import re
 from datetime import datetime
 
@@ -53,34 +58,32 @@ PKG_KIND_ALIASES = {
 }
 
 
+# Алиасы собраны в автоматы один раз: все совпадения строки — за один проход
+CITY_MATCHER = AliasMatcher(CITY_ALIASES)
+KIND_MATCHER = AliasMatcher(PKG_KIND_ALIASES)
+
+
 def find_palm_packages(ws) -> list[dict]:
     """
     Ищет «шапки» пакетов на листе паломников.
     Возвращает список словарей: {'title': str, 'row': int, 'col': int}
     """
-    data = ws.get_all_values()
-    H = len(data)
+    # результат запоминается в снимке листа; наружу — копии
+    return [dict(p) for p in _snapshot_packages(get_snapshot(ws))]
+
+def _snapshot_packages(snap: SheetSnapshot) -> list[dict]:
+    return snap.memo("palm_packages", lambda: _find_palm_packages(snap.values))
+
+def _find_palm_packages(data: list[list[str]]) -> list[dict]:
+    idx = sheet_index(data)
     found = []
 
-    for r in range(H):
-        row = data[r]
-        for c, raw in enumerate(row):
-            txt = normtxt(str(raw))
-            if not txt:
-                continue
-            # ищем диапазон дат в заголовке пакета
-            if RANGE_RE.search(txt):
-                header_nearby = False
-                for k in range(1, 6):  # смотрим 1..5 строк ниже
-                    rr = r + k
-                    if rr < H and row_has_table_header(data[rr]):
-                        header_nearby = True
-                        break
-                if not header_nearby:
-                    continue
-
-                found.append({"title": txt, "row": r, "col": c})
-                break  
+    # в каждой строке — первая ячейка с диапазоном дат в заголовке пакета
+    for r, (c, txt) in sorted(idx.first_cell_matching(RANGE_RE, normtxt).items()):
+        # смотрим 1..5 строк ниже
+        if not any(r + k in idx.table_header_rows for k in range(1, 6)):
+            continue
+        found.append({"title": txt, "row": r, "col": c})
 
     uniq, seen = [], set()
     for item in sorted(found, key=lambda x: x["row"]):
@@ -92,7 +95,7 @@ def find_palm_packages(ws) -> list[dict]:
 def row_has_any(row, keywords: tuple[str, ...]) -> bool:
     """Проверяет, содержит ли строка любые из ключевых слов"""
     line = low(' '.join(row))
-    return any(k in line for k in keywords)
+    return words_matcher(tuple(keywords)).any(line)
 
 def find_config_block(data: list[list[str]], start_r: int, end_r: int, want_kind: str) -> tuple[int | None, dict]:
     want_kind = (want_kind or "niyet").lower()
@@ -113,20 +116,20 @@ def find_config_block(data: list[list[str]], start_r: int, end_r: int, want_kind
             return None
         return nights(parts[0], parts[1])
 
+    idx = sheet_index(data)
+
     # Ищем строки с ключевыми словами пакета ПО ВСЕМУ ЛИСТУ, начиная со start_r
-    for r in range(start_r, H):
-        row = data[r]
-        if not row_has_any(row, want_words):
+    for r in idx.rows_with_any(want_words):
+        if r < start_r:
             continue
+        row = data[r]
 
         print(f" Найдена строка с ключевыми словами в R{r+1}: {row}")
 
         # смотрим текущую и 4 следующие строки на наличие городов
         for rr in range(r, min(r + 5, H)):
-            rw = data[rr]
-
             # Ищем Медина + отель + даты
-            h, w = extract_city_line(rw, "madinah")
+            h, w = city_line(idx, rr, "madinah")
             if h and not mad["hotel"]:
                 mad["hotel"] = h
                 print(f" Найдена Медина: {h}")
@@ -135,7 +138,7 @@ def find_config_block(data: list[list[str]], start_r: int, end_r: int, want_kind
                 print(f" Даты Медины: {w}")
 
             # Ищем Мекка + отель + даты
-            h, w = extract_city_line(rw, "makkah")
+            h, w = city_line(idx, rr, "makkah")
             if h and not mak["hotel"]:
                 mak["hotel"] = h
                 print(f" Найдена Мекка: {h}")
@@ -209,9 +212,17 @@ def find_config_block_by_package_name(
     madinah_found = None
     makkah_found = None
 
+    # строки с датой этого дня-месяца — из обратного индекса дат, без разбора остальных
+    start_rows = None
+    if start_ddmm:
+        dd, mm = start_ddmm.split("/")
+        start_rows = date_grid(data).rows_with_day_month(int(dd), int(mm))
+
+    idx = sheet_index(data)
     for r in range(search_start, H):
-        row = data[r]
-        city, hotel, d1, d2 = extract_city_line_simple(row)
+        if start_rows is not None and r not in start_rows:
+            continue
+        city, hotel, d1, d2 = city_line_simple(idx, r)
         if not city or not d1 or not d2:
             continue
 
@@ -292,9 +303,10 @@ def find_config_block_4u(data: list[list[str]], package_title: str) -> tuple[int
     start_row = max(0, H - 40)
     last_madinah = None
 
+    idx = sheet_index(data)
     for r in range(start_row, H):
         row = data[r]
-        city, hotel, d1, d2 = extract_city_line_simple(row)
+        city, hotel, d1, d2 = city_line_simple(idx, r)
         if not city or not d1 or not d2:
             continue
 
@@ -368,7 +380,8 @@ def debug_show_config_area(data: list[list[str]], start_row: int, num_rows: int
         if non_empty:
             print(f"R{r+1}: {non_empty}")
 
-def collect_voucher_by_package(ws, pkg_row: int, pkg_title: str, *, look_through_next_packages: int = 2) -> dict:
+def collect_voucher_by_package(ws, pkg_row: int, pkg_title: str, *, look_through_next_packages: int = 2,
+                               snap: SheetSnapshot | None = None) -> dict:
     """
     ОСНОВНАЯ ЛОГИКА СБОРКИ ДАННЫХ:
     1. Сначала конфигурация отелей
@@ -376,9 +389,11 @@ def collect_voucher_by_package(ws, pkg_row: int, pkg_title: str, *, look_through
        - для остальных: сначала по типу (HIKMA / IZI / NIYET / AA и т.п.), потом fallback по названию
     2. Потом транспорт
     3. Потом люди
+    snap — снимок, с которым работать (по умолчанию текущий снимок листа ws).
     """
-    all_values = ws.get_all_values()
-    r0, r1, all_pk = package_bounds(ws, pkg_row)
+    snap = snap or get_snapshot(ws)
+    all_values = snap.values
+    r0, r1, all_pk = package_bounds(ws, pkg_row, snap)
     want = kind_from_title(pkg_title)
     title_lower = str(pkg_title).lower()
     is_4u = is_4u_title(pkg_title)
@@ -577,6 +592,54 @@ def collect_voucher_by_package(ws, pkg_row: int, pkg_title: str, *, look_through
     return fallback
 
 
+def _package_voucher(ws, snap: SheetSnapshot, pkg_row: int, pkg_title: str) -> dict:
+    """Ваучер одного пакета; запоминается в снимке — повторно пакет не разбирается."""
+    return snap.memo(
+        ("package", pkg_row, pkg_title),
+        lambda: collect_voucher_by_package(ws, pkg_row, pkg_title, look_through_next_packages=2, snap=snap),
+    )
+
+
+def parse_all_packages(ws) -> dict[int, dict | None]:
+    """
+    Разбирает все пакеты листа разом: {строка пакета: ваучер} (для фоновой предзагрузки).
+    Результат живёт в снимке листа, пока тот не обновится. None — пакет не разобрался.
+    """
+    # все пакеты разбираем по одному снимку, даже если лист тем временем обновится
+    snap = get_snapshot(ws)
+
+    def build():
+        parsed = {}
+        for p in _snapshot_packages(snap):
+            try:
+                parsed[p["row"]] = _package_voucher(ws, snap, p["row"], p["title"])
+            except Exception as e:
+                print(f" Пакет '{p['title']}' (строка {p['row']}) не разобран: {e}")
+                parsed[p["row"]] = None
+        print(f" Разобрано пакетов на листе '{ws.title}': {len(parsed)}")
+        return parsed
+    return snap.memo("parsed_packages", build)
+
+
+def parsed_packages_if_ready(ws) -> dict[int, dict | None] | None:
+    """Результат parse_all_packages, если лист уже разобран (например, prefetch); иначе None."""
+    return get_snapshot(ws).cached("parsed_packages")
+
+
+def voucher_for_package(ws, pkg_row: int, pkg_title: str) -> dict:
+    """
+    Ваучер одного пакета; копия — её можно править.
+    Если лист уже разобран целиком (prefetch) — берём оттуда, иначе разбираем
+    только этот пакет, остальные пакеты листа не трогаем.
+    """
+    snap = get_snapshot(ws)
+    parsed = snap.cached("parsed_packages")
+    voucher = parsed.get(pkg_row) if parsed else None
+    if voucher is None:
+        voucher = _package_voucher(ws, snap, pkg_row, pkg_title)
+    return copy.deepcopy(voucher)
+
+
 def nights(d1: str, d2: str) -> int|None:
     """Вычисляет количество ночей между двумя датами"""
     try:
@@ -598,11 +661,11 @@ def extract_city_line_simple(row):
     # 1) Определяем город
     city = None
     for part in parts:
-        low_part = part.lower()
-        if any(name in low_part for name in CITY_ALIASES["madinah"]):
+        hits = CITY_MATCHER.hits(part.lower())
+        if "madinah" in hits:
             city = "Madinah"
             break
-        if any(name in low_part for name in CITY_ALIASES["makkah"]):
+        if "makkah" in hits:
             city = "Makkah"
             break
 
@@ -632,7 +695,7 @@ def extract_city_line_simple(row):
         low_part = part.lower()
 
         if not seen_city:
-            if any(name in low_part for name in CITY_ALIASES["madinah"] + CITY_ALIASES["makkah"]):
+            if CITY_MATCHER.any(low_part):
                 seen_city = True
             continue
 
@@ -645,9 +708,10 @@ def extract_city_line_simple(row):
     return city, hotel, d1, d2
 
 
-def package_bounds(ws, pkg_row: int) -> tuple[int, int, list[dict]]:
-    all_pk = find_palm_packages(ws)
-    H = len(ws.get_all_values())
+def package_bounds(ws, pkg_row: int, snap: SheetSnapshot | None = None) -> tuple[int, int, list[dict]]:
+    snap = snap or get_snapshot(ws)
+    all_pk = [dict(p) for p in _snapshot_packages(snap)]
+    H = len(snap.values)
     nxt = H
     for p in all_pk:
         if p["row"] > pkg_row:
@@ -657,10 +721,8 @@ def package_bounds(ws, pkg_row: int) -> tuple[int, int, list[dict]]:
 
 def kind_from_title(title: str) -> str:
     t = low(str(title))
-    for canon, variants in PKG_KIND_ALIASES.items():
-        if any(v in t for v in variants):
-            return canon
-    return "niyet"
+    # первый по порядку PKG_KIND_ALIASES тип, чей алиас есть в названии
+    return KIND_MATCHER.first(t) or "niyet"
 
 def first_ddmm_from_title(title: str) -> str | None:
 
@@ -670,19 +732,41 @@ def first_ddmm_from_title(title: str) -> str | None:
     dd, mm, yy = m[0]
     return f"{dd.zfill(2)}/{mm.zfill(2)}"
 
-def extract_city_line(row, city_key: str) -> tuple[str|None, str|None]:
-    """Из одной строки пробуем достать hotel + две даты"""
-    aliases = CITY_ALIASES[city_key]
-
+def extract_city_line(row, city_key: str, dates_in=None) -> tuple[str|None, str|None]:
+    """
+    Из одной строки пробуем достать hotel + две даты.
+    dates_in(c0, c1) — уже разобранные даты ячеек [c0; c1) (DateGrid.tokens_in).
+    """
     for c, cell in enumerate(row):
         lc = low(cell)
-        if any(a in lc for a in aliases):
+        if city_key in CITY_MATCHER.hits(lc):
             hotel = hotel_to_right(row, c) or None
-            d1, d2 = two_dates_from_cells(row[c:c+8])
+            if dates_in is not None:
+                d1, d2 = two_dates_from_tokens(dates_in(c, c + 8))
+            else:
+                d1, d2 = two_dates_from_cells(row[c:c+8])
             when = f"{d1} – {d2}" if d1 and d2 else None
             return hotel, when
     return None, None
 
+def city_line(idx: SheetIndex, r: int, city_key: str) -> tuple[str|None, str|None]:
+    """extract_city_line по индексу: разбираем только строки, где есть название города."""
+    def build():
+        grid = date_grid(idx.data)
+        rows = set(idx.rows_with_any(tuple(CITY_ALIASES[city_key])))
+        return {
+            rr: extract_city_line(idx.data[rr], city_key, lambda c0, c1, rr=rr: grid.tokens_in(rr, c0, c1))
+            for rr in rows
+        }
+    return idx.memo(("city_line", city_key), build).get(r, (None, None))
+
+def city_line_simple(idx: SheetIndex, r: int):
+    """extract_city_line_simple с запоминанием результата для строки."""
+    lines = idx.memo("city_line_simple", dict)
+    if r not in lines:
+        lines[r] = extract_city_line_simple(idx.data[r])
+    return lines[r]
+
 def hotel_to_right(row, city_col: int) -> str:
     """Ищет отель справа от города"""
     for j in range(city_col + 1, len(row)):
@@ -693,10 +777,10 @@ def hotel_to_right(row, city_col: int) -> str:
 
 # Вспомогательные функции
 def low(s: str) -> str:
-    return re.sub(r'[\s\u00A0\u202F]+', ' ', (str(s) or '')).strip().lower()
+    return norm_forms(str(s)).lower
 
 def norm_spaces(s: str) -> str:
-    return re.sub(r'[\s\u00A0\u202F]+', ' ', (str(s) or '')).strip()
+    return norm_forms(str(s)).spaces
 
 def to_slash(d: str) -> str:
     return d.replace('.', '/')
@@ -704,7 +788,10 @@ def to_slash(d: str) -> str:
 def two_dates_from_cells(cells) -> tuple[str|None, str|None]:
     """Извлекает две даты из ячеек"""
     txt = ' '.join(norm_spaces(str(x)) for x in cells)
-    m = DATE_ANY.findall(txt)
+    return two_dates_from_tokens(DATE_ANY.findall(txt))
+
+def two_dates_from_tokens(m) -> tuple[str|None, str|None]:
+    """Первые две даты из найденных DATE_ANY совпадений (dd, mm, yy) → 'dd/mm/yyyy'"""
     if len(m) >= 2:
         def build(t):
             dd, mm, yy = t
@@ -719,9 +806,8 @@ def normtxt(s: str) -> str:
 
 def row_has_table_header(row) -> bool:
     """Проверяет, содержит ли строка заголовок таблицы"""
-    header_keywords = ['name', 'names', 'фио', 'паломник', 'pilgrim', 'room', 'комната']
     row_text = ' '.join(str(cell) for cell in row).lower()
-    return any(keyword in row_text for keyword in header_keywords)
+    return any(keyword in row_text for keyword in TABLE_HEADER_KEYWORDS)
 
 def is_4u_title(title: str) -> bool:
     t = low(str(title))
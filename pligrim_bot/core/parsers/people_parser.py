@@ -1,4 +1,6 @@
 from pligrim_bot.config.constants import *
+from pligrim_bot.core.utils.matcher import AliasMatcher
+from pligrim_bot.core.utils.text_utils import norm_forms
 
 def get_last(row, cols):   return _norm_spaces(row[cols["last"]])  if "last"  in cols and cols["last"]  < len(row) else ""
 def get_first(row, cols):  return _norm_spaces(row[cols["first"]]) if "first" in cols and cols["first"] < len(row) else ""
@@ -15,47 +17,47 @@ def is_guest_row(row: list[str], cols: dict) -> bool:
         return False
     
     low_last, low_first = last.lower(), first.lower()
-    if any(tok in low_last for tok in NOISE_TOKENS) or any(tok in low_first for tok in NOISE_TOKENS):
+    if NOISE_MATCHER.any(low_last) or NOISE_MATCHER.any(low_first):
         return False
     return is_valid_name(last) or is_valid_name(first)
 
 
-def detect_people_header(row: list[str]) -> dict | None:
-    """Исправленный поиск заголовков для вашей структуры"""
+def detect_people_header(row: list[str], verbose: bool = True) -> dict | None:
+    """Исправленный поиск заголовков для вашей структуры (verbose=False — без отладочного вывода)"""
     if not row:
         return None
 
     cols = {}
-    print(f" Поиск заголовков в строке: {row}")
+    if verbose: print(f" Поиск заголовков в строке: {row}")
 
     for i, cell in enumerate(row):
         cell_text = norm_hdr(cell)
         if not cell_text:
             continue
 
-        print(f"  Ячейка {i}: '{cell_text}'")
+        if verbose: print(f"  Ячейка {i}: '{cell_text}'")
 
         # Тип комнаты - может быть ПЕРВОЙ колонкой!
         if any(keyword in cell_text for keyword in ["type of room", "room type", "тип номера", "room", "type"]):
             cols["room"] = i
-            print(f"     Найден тип комнаты в колонке {i}")
+            if verbose: print(f"     Найден тип комнаты в колонке {i}")
 
         # Фамилия
         if any(keyword in cell_text for keyword in ["last name", "фамилия", "surname", "lastname"]):
             cols["last"] = i
-            print(f"     Найдена фамилия в колонке {i}")
+            if verbose: print(f"     Найдена фамилия в колонке {i}")
 
         # Имя
         if any(keyword in cell_text for keyword in ["first name", "имя", "firstname"]):
             cols["first"] = i
-            print(f"     Найдено имя в колонке {i}")
+            if verbose: print(f"     Найдено имя в колонке {i}")
 
         # Питание (может быть второй колонкой)
         if any(keyword in cell_text for keyword in ["meal", "meal a day", "питание", "hb", "ro"]):
             cols["meal"] = i
-            print(f"     Найдено питание в колонке {i}")
+            if verbose: print(f"     Найдено питание в колонке {i}")
 
-    print(f" Итоговые колонки: {cols}")
+    if verbose: print(f" Итоговые колонки: {cols}")
 
     # Принимаем если есть либо фамилия/имя, либо оба
     if "last" in cols or "first" in cols:
@@ -168,6 +170,10 @@ for w in HOTELS_NAME_HINTS:
 
 NOISE_TOKENS = BASE_NOISE_TOKENS | EXTRA_NOISE
 
+# Служебные слова и типы номеров — одним автоматом вместо перебора подстрок
+NOISE_MATCHER = AliasMatcher.from_words(NOISE_TOKENS)
+ROOM_MATCHER = AliasMatcher(ROOM_ALIASES)
+
 
 def collect_people_groups(
         data: list[list[str]],
@@ -388,7 +394,7 @@ def is_valid_name(name: str) -> bool:
 
     # 2) служебные слова
     low = s.lower()
-    if any(tok in low for tok in NOISE_TOKENS):
+    if NOISE_MATCHER.any(low):
         return False
 
     # 3) отбрасываем одиночные маркеры
@@ -409,11 +415,10 @@ def is_valid_name(name: str) -> bool:
 
 
 def _norm_hdr(s: str) -> str:
-    import re
-    return re.sub(r"[\s\u00A0\u202F]+", " ", (s or "").strip().lower())
+    return norm_forms(s or "").lower
 
 def _norm_spaces(s: str) -> str:
-    return re.sub(r'[\s\u00A0\u202F]+', ' ', (s or '')).strip()
+    return norm_forms(s or "").spaces
 
 
 def _get_person_name(row, cols):
@@ -437,9 +442,9 @@ def _norm_room_kind(s: str, prev: str | None) -> str | None:
     if not t:
         return prev  # <-- тянем прошлый
 
-    for k, als in ROOM_ALIASES.items():
-        if any(a in t for a in als):
-            return k
+    k = ROOM_MATCHER.first(t)
+    if k:
+        return k
 
     # Числовые подсказки
     if "4" in t: return "quad"
@@ -481,9 +486,9 @@ def canon_room_kind(value: str | None) -> str | None:
     s = norm_hdr(value)
     if not s:
         return None
-    for canon, variants in ROOM_ALIASES.items():
-        if any(v in s for v in variants):
-            return canon
+    canon = ROOM_MATCHER.first(s)
+    if canon:
+        return canon
     # иногда пишут «2-мест», «3-мест»
     if "2" in s: return "dbl"
     if "3" in s: return "trpl"
@@ -502,19 +507,21 @@ def canon_room(value: str) -> tuple[str|None, int|None]:
 
 def find_people_header_in_range(data, a, b):
     """Поиск заголовков с расширенным диапазоном"""
+    # индекс импортируем здесь: sheet_index сам использует detect_people_header
+    from pligrim_bot.core.parsers.sheet_index import sheet_index
+    idx = sheet_index(data)
+
     # Сначала ищем вблизи начала пакета
-    for r in range(a, min(b, len(data))):
-        cols = detect_people_header(data[r])
-        if cols:
-            print(f"[DEBUG] Найден заголовок в строке {r}: {cols}")
-            return r, cols
+    r = idx.first_people_header(a, min(b, len(data)))
+    if r is not None:
+        print(f"[DEBUG] Найден заголовок в строке {r}: {idx.people_headers[r]}")
+        return r, dict(idx.people_headers[r])
 
     # Если не нашли - ищем в первых 30 строках после начала пакета
-    for r in range(a, min(a + 30, len(data))):
-        cols = detect_people_header(data[r])
-        if cols:
-            print(f"[DEBUG] Найден заголовок в расширенном поиске (строка {r}): {cols}")
-            return r, cols
+    r = idx.first_people_header(a, min(a + 30, len(data)))
+    if r is not None:
+        print(f"[DEBUG] Найден заголовок в расширенном поиске (строка {r}): {idx.people_headers[r]}")
+        return r, dict(idx.people_headers[r])
 
     return None, None
 
@@ -524,9 +531,9 @@ def _norm_room_kind(s: str, prev: str|None) -> str|None:
 
     # Если есть явный тип - возвращаем его
     if t:
-        for k, als in ROOM_ALIASES.items():
-            if any(a in t for a in als):
-                return k
+        k = ROOM_MATCHER.first(t)
+        if k:
+            return k
         # Цифровые указания
         if "2" in t: return "dbl"
         if "3" in t: return "trpl"
@@ -541,9 +548,7 @@ def norm_hdr(s: str) -> str:
     if s is None:
         return ""
     # Базовая очистка, сохраняем пробелы для точного поиска
-    s = str(s).replace("\xa0", " ").replace("\u202f", " ").lower().strip()
-    s = re.sub(r"\s+", " ", s)  # заменяем множественные пробелы на один
-    return s
+    return norm_forms(s).lower
 
 def ensure_tmp():
     os.makedirs(TMP_DIR, exist_ok=True)
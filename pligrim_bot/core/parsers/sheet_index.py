@@ -0,0 +1,122 @@
+import bisect
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable
+
+from pligrim_bot.config.constants import BUS_RE, TRAIN_RE, TRANSFER_RE
+from pligrim_bot.core.parsers.people_parser import detect_people_header
+from pligrim_bot.core.utils.matcher import words_matcher
+from pligrim_bot.core.utils.text_utils import row_text
+
+# Слова, по которым строка считается шапкой таблицы пакета (row_has_table_header)
+TABLE_HEADER_KEYWORDS = ('name', 'names', 'фио', 'паломник', 'pilgrim', 'room', 'комната')
+
+_SPACES = re.compile(r'[\s\u00A0\u202F]+')
+
+
+class SheetIndex:
+    """
+    Индекс листа за один проход по data:
+      - нормализованный текст каждой строки (как low() и row_has_table_header);
+      - строки-шапки таблиц пакетов и строки с колонками людей (detect_people_header);
+      - строки транспорта с признаками поезд/автобус/трансфер.
+    Выборки по ключевым словам и разобранные строки городов считаются
+    при первом запросе и запоминаются (memo) — парсеры не сканируют лист заново.
+    """
+
+    def __init__(self, data: list[list[str]]):
+        self.data = data
+        self.height = len(data)
+        self.low: list[str] = []
+        self.table_header_rows: set[int] = set()
+        self.people_headers: dict[int, dict] = {}
+        self.transport_rows: list[int] = []
+        self.transport: dict[int, tuple[str, bool, bool, bool]] = {}
+        self._memo: dict = {}
+        self._memo_lock = threading.RLock()
+
+        for r, row in enumerate(data):
+            joined = ' '.join(row)
+            self.low.append(_SPACES.sub(' ', joined).strip().lower())
+
+            if any(k in joined.lower() for k in TABLE_HEADER_KEYWORDS):
+                self.table_header_rows.add(r)
+
+            cols = detect_people_header(row, verbose=False)
+            if cols:
+                self.people_headers[r] = cols
+
+            txt = row_text(row)
+            if txt:
+                has_train = bool(TRAIN_RE.search(txt))
+                has_bus = bool(BUS_RE.search(txt))
+                has_transfer = bool(TRANSFER_RE.search(txt))
+                if has_train or has_bus or has_transfer:
+                    self.transport_rows.append(r)
+                    self.transport[r] = (txt, has_train, has_bus, has_transfer)
+
+        self._people_header_rows = sorted(self.people_headers)
+
+    def memo(self, name: Any, build: Callable[[], Any]) -> Any:
+        with self._memo_lock:
+            if name not in self._memo:
+                self._memo[name] = build()
+            return self._memo[name]
+
+    def rows_with_any(self, words: tuple[str, ...]) -> list[int]:
+        """Строки, где встречается любое из слов (как row_has_any), по возрастанию."""
+        matcher = words_matcher(words)
+        return self.memo(("any", words), lambda: [
+            r for r, line in enumerate(self.low) if matcher.any(line)
+        ])
+
+    def first_cell_matching(self, rx: re.Pattern, norm: Callable[[str], str]) -> dict[int, tuple[int, str]]:
+        """Для каждой строки — первая ячейка, чей norm(текст) совпадает с rx: {row: (col, text)}."""
+        def build():
+            hits = {}
+            for r, row in enumerate(self.data):
+                for c, raw in enumerate(row):
+                    txt = norm(str(raw))
+                    if txt and rx.search(txt):
+                        hits[r] = (c, txt)
+                        break
+            return hits
+        return self.memo(("cell", rx.pattern, norm), build)
+
+    def transport_in(self, a: int, b: int) -> list[int]:
+        """Строки транспорта в диапазоне [a; b)."""
+        lo = bisect.bisect_left(self.transport_rows, a)
+        hi = bisect.bisect_left(self.transport_rows, b)
+        return self.transport_rows[lo:hi]
+
+    def first_people_header(self, a: int, b: int) -> int | None:
+        """Первая строка с колонками людей в диапазоне [a; b)."""
+        i = bisect.bisect_left(self._people_header_rows, a)
+        if i < len(self._people_header_rows) and self._people_header_rows[i] < b:
+            return self._people_header_rows[i]
+        return None
+
+
+# Индексы последних листов. data — общий список из снимка (data/snapshots.py),
+# поэтому новый снимок — новый объект и новый индекс.
+_indexes: OrderedDict[int, SheetIndex] = OrderedDict()
+_lock = threading.Lock()
+_MAX_INDEXES = 32
+
+
+def sheet_index(data: list[list[str]]) -> SheetIndex:
+    key = id(data)
+    with _lock:
+        idx = _indexes.get(key)
+        if idx is not None and idx.data is data:
+            _indexes.move_to_end(key)
+            return idx
+
+    idx = SheetIndex(data)
+    with _lock:
+        _indexes[key] = idx
+        _indexes.move_to_end(key)
+        while len(_indexes) > _MAX_INDEXES:
+            _indexes.popitem(last=False)
+    return idx
@@ -1,3 +1,4 @@
+from pligrim_bot.core.parsers.sheet_index import sheet_index
 from pligrim_bot.core.utils.text_utils import *
 from pligrim_bot.core.utils.validation import *
 
@@ -72,29 +73,27 @@ def collect_transport(data: list[list[str]], from_row: int, to_row: int) -> dict
     a = max(0, from_row)
     b = min(H, to_row)
 
-    for r in range(a, b):
-        txt = " ".join((c or "").strip() for c in data[r] if c).strip()
-        if not txt:
-            continue
+    # строки с поездом/автобусом/трансфером уже найдены в индексе листа
+    idx = sheet_index(data)
+    for r in idx.transport_in(a, b):
+        txt, has_train, has_bus, _ = idx.transport[r]
 
-        found = False
-        if TRAIN_RE.search(txt):
-            types.add("поезд"); found = True
-        if BUS_RE.search(txt):
-            types.add("автобус"); found = True
+        if has_train:
+            types.add("поезд")
+        if has_bus:
+            types.add("автобус")
         # TRANSFER_RE — только как маркер блока, в types не добавляем
 
-        if found or TRANSFER_RE.search(txt):
-            lines.append(txt)
-            m_route = ROUTE_RE.search(txt)
-            m_time  = TIME_RE.search(txt)
-            details.append({
-                "raw": txt,
-                "route": f"{m_route.group(1).upper()}–{m_route.group(2).upper()}" if m_route else None,
-                "time": m_time.group(0) if m_time else None,
-                "has_train": bool(TRAIN_RE.search(txt)),
-                "has_bus": bool(BUS_RE.search(txt)),
-            })
+        lines.append(txt)
+        m_route = ROUTE_RE.search(txt)
+        m_time  = TIME_RE.search(txt)
+        details.append({
+            "raw": txt,
+            "route": f"{m_route.group(1).upper()}–{m_route.group(2).upper()}" if m_route else None,
+            "time": m_time.group(0) if m_time else None,
+            "has_train": has_train,
+            "has_bus": has_bus,
+        })
 
     # В display выводим только поезд/автобус (без «трансфер»)
     order = [("поезд","Поезд"), ("автобус","Автобус")]
@@ -0,0 +1,86 @@
+import asyncio
+
+from pligrim_bot.config.app_config import config
+from pligrim_bot.core.parsers.package_parser import find_palm_packages, parse_all_packages
+from pligrim_bot.core.sheets_gateway import aget_palm_worksheet, sheets_call
+from pligrim_bot.data.snapshots import load_snapshots
+
+
+class SheetPrefetcher:
+    """
+    Фоновая подгрузка листов, по которым оператор, скорее всего, кликнет следующим.
+    Снимки листов месяца грузятся одним batchGet, затем для каждого листа
+    греются список пакетов и разобранные пакеты (memo снимка),
+    так что следующий клик отвечает из кэша. Одновременно грузится не больше
+    workers листов — запросам пользователей пул Google Sheets не перекрываем.
+    """
+
+    def __init__(self, limit: int, workers: int):
+        self.limit = limit
+        self.workers = workers
+        self._slots: asyncio.Semaphore | None = None
+        self._tasks: dict[tuple[str, str], asyncio.Task] = {}
+        self.stats = {"scheduled": 0, "warmed": 0, "failed": 0}
+
+    def schedule(self, month_key: str, titles: list[str]) -> None:
+        """Ставит в очередь первые limit листов месяца; уже загружаемые пропускает."""
+        if self.limit <= 0:
+            return
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+
+        titles = [t for t in titles[:self.limit] if (month_key, t) not in self._tasks]
+        if not titles:
+            return
+        task = asyncio.create_task(self._warm_month(month_key, titles))
+        for title in titles:
+            self._tasks[(month_key, title)] = task
+        self.stats["scheduled"] += len(titles)
+
+    async def _warm_month(self, month_key: str, titles: list[str]) -> None:
+        try:
+            worksheets = []
+            for title in titles:
+                ws = await aget_palm_worksheet(month_key, title)
+                if ws is not None:
+                    worksheets.append(ws)
+
+            if worksheets:
+                # снимки всех листов — одним batchGet; не вышло — _warm загрузит их по одному
+                try:
+                    async with self._slots:
+                        await sheets_call(load_snapshots, worksheets[0].spreadsheet, worksheets)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f" Пакетная предзагрузка {month_key} не удалась: {e}")
+
+            await asyncio.gather(*(self._warm(month_key, ws) for ws in worksheets))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.stats["failed"] += len(titles)
+            print(f" Предзагрузка листов {month_key} не удалась: {e}")
+        finally:
+            for title in titles:
+                self._tasks.pop((month_key, title), None)
+
+    async def _warm(self, month_key: str, ws) -> None:
+        try:
+            async with self._slots:
+                if await sheets_call(find_palm_packages, ws):
+                    await sheets_call(parse_all_packages, ws)
+            self.stats["warmed"] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.stats["failed"] += 1
+            print(f" Предзагрузка листа '{ws.title}' ({month_key}) не удалась: {e}")
+
+    def cancel(self) -> None:
+        for task in set(self._tasks.values()):
+            task.cancel()
+        self._tasks.clear()
+
+
+prefetcher = SheetPrefetcher(limit=config.prefetch_sheets, workers=config.prefetch_workers)
@@ -0,0 +1,111 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from pligrim_bot.config.app_config import config
+from pligrim_bot.config.settings import get_worksheet, sheets_directory
+from pligrim_bot.core.google_sheets import get_palm_sheet_names, get_palm_worksheet
+from pligrim_bot.data.snapshots import sheet_values
+
+# Все блокирующие вызовы gspread выполняются здесь, а не в цикле событий aiogram.
+_executor = ThreadPoolExecutor(max_workers=config.sheets_workers, thread_name_prefix="sheets")
+_slots: asyncio.Semaphore | None = None
+
+
+class SheetsTimeout(TimeoutError):
+    """Google Sheets не ответил за отведённое время."""
+
+
+def _get_slots() -> asyncio.Semaphore:
+    # ограничиваем очередь к пулу: лишние вызовы ждут в asyncio и их можно отменить
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(config.sheets_workers * 2)
+    return _slots
+
+
+async def sheets_call(fn, *args, timeout: float | None = None, **kwargs):
+    """
+    Выполняет синхронную функцию (gspread, парсеры листа) в пуле потоков.
+    Кидает SheetsTimeout, если ответа нет за timeout секунд (по умолчанию SHEETS_TIMEOUT);
+    исключения самой fn (в том числе её TimeoutError) пробрасываются как есть.
+    """
+    loop = asyncio.get_running_loop()
+    call = functools.partial(fn, *args, **kwargs)
+    timeout = timeout or config.sheets_timeout
+    deadline = loop.time() + timeout
+    slots = _get_slots()
+
+    try:
+        await asyncio.wait_for(slots.acquire(), timeout)
+    except asyncio.TimeoutError:
+        raise _timed_out(fn) from None
+
+    try:
+        fut = loop.run_in_executor(_executor, call)
+    except BaseException:
+        slots.release()
+        raise
+
+    def _release(f: asyncio.Future) -> None:
+        # поток отпускаем, только когда он действительно закончил — даже если ответа уже не ждут
+        slots.release()
+        if not f.cancelled():
+            f.exception()  # после таймаута результат никто не заберёт — не шумим в лог
+
+    fut.add_done_callback(_release)
+
+    done, _ = await asyncio.wait({fut}, timeout=max(0.0, deadline - loop.time()))
+    if not done:
+        raise _timed_out(fn)
+    return fut.result()
+
+
+def _timed_out(fn) -> SheetsTimeout:
+    name = getattr(fn, "__name__", repr(fn))
+    print(f" Google Sheets не ответил вовремя: {name}")
+    return SheetsTimeout(name)
+
+
+# --- Асинхронные обёртки над core/google_sheets.py и config/settings.py ---
+
+async def aget_palm_worksheet(month_key: str, ws_title: str):
+    return await sheets_call(get_palm_worksheet, month_key, ws_title)
+
+
+async def aget_palm_sheet_names(month_key: str, *, include_past: bool = False) -> list[str]:
+    return await sheets_call(get_palm_sheet_names, month_key, include_past=include_past)
+
+
+async def aget_worksheet(month_key: str, sheet_name: str):
+    return await sheets_call(get_worksheet, month_key, sheet_name)
+
+
+async def asheet_values(ws) -> list[list[str]]:
+    return await sheets_call(sheet_values, ws)
+
+
+async def keep_sheets_directory_fresh(retry_after: float = 30) -> None:
+    """
+    Список таблиц ищем после старта polling: бот отвечает сразу, а до конца
+    первого поиска показывает 'таблицы загружаются'. Потом обновляем список
+    каждые SHEETS_DIRECTORY_REFRESH секунд — новые месяцы появляются без перезапуска.
+    """
+    while True:
+        try:
+            ok = await sheets_call(sheets_directory.refresh, timeout=max(config.sheets_timeout, 120))
+        except Exception as e:
+            print(f" Поиск таблиц не удался: {e}")
+            ok = False
+
+        if not ok:
+            print(f" Повторим поиск таблиц через {retry_after:.0f} c")
+            await asyncio.sleep(retry_after)
+        elif config.sheets_directory_refresh > 0:
+            await asyncio.sleep(config.sheets_directory_refresh)
+        else:
+            return
+
+
+def shutdown() -> None:
+    _executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,71 @@
+import builtins
+import importlib.util
+import sys
+import threading
+import time
+
+
+class ImportProfiler:
+    """
+    Время импорта модулей при старте — как python -X importtime, но прямо в логе бота.
+    Перехватывает builtins.__import__ и для каждого впервые загружаемого модуля
+    считает собственное время и время вместе с вложенными импортами.
+    Стек вложенных импортов свой у каждого потока (обработчики грузятся в фоне).
+    """
+
+    def __init__(self):
+        self.records: dict[str, tuple[float, float]] = {}  # модуль → (своё, всего)
+        self._local = threading.local()
+        self._orig = None
+        self._started = 0.0
+
+    def install(self) -> None:
+        if self._orig is not None:
+            return
+        self._orig = builtins.__import__
+        self._started = time.perf_counter()
+        builtins.__import__ = self._import
+
+    def uninstall(self) -> None:
+        if self._orig is not None:
+            builtins.__import__ = self._orig
+            self._orig = None
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        try:
+            full = importlib.util.resolve_name("." * level + name, (globals or {}).get("__package__")) if level else name
+        except (ImportError, ValueError):
+            full = name
+        if full in sys.modules:
+            return self._orig(name, globals, locals, fromlist, level)
+
+        stack = self._local.__dict__.setdefault("stack", [])
+        stack.append(0.0)
+        t0 = time.perf_counter()
+        try:
+            return self._orig(name, globals, locals, fromlist, level)
+        finally:
+            total = time.perf_counter() - t0
+            children = stack.pop()
+            self.records[full] = (total - children, total)
+            if stack:
+                stack[-1] += total
+
+    def report(self, top: int = 15) -> None:
+        elapsed = time.perf_counter() - self._started
+        print(f" Импорт при старте: {elapsed:.2f} c, модулей загружено: {len(self.records)}")
+
+        print(" Дольше всего (вместе с вложенными импортами):")
+        for name, (own, total) in sorted(self.records.items(), key=lambda kv: -kv[1][1])[:top]:
+            print(f"   {total * 1000:8.1f} мс  (своё {own * 1000:7.1f})  {name}")
+
+        by_package: dict[str, float] = {}
+        for name, (own, _) in self.records.items():
+            pkg = name.split(".", 1)[0]
+            by_package[pkg] = by_package.get(pkg, 0.0) + own
+        print(" По пакетам (собственное время):")
+        for pkg, own in sorted(by_package.items(), key=lambda kv: -kv[1])[:top]:
+            print(f"   {own * 1000:8.1f} мс  {pkg}")
+
+
+import_profiler = ImportProfiler()
@@ -0,0 +1,136 @@
+import asyncio
+import time
+
+from aiogram.exceptions import TelegramRetryAfter
+
+from pligrim_bot.config.app_config import config
+
+
+class TokenBucket:
+    """Ведро токенов: rate токенов в секунду, не больше capacity про запас."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, cost: float = 1) -> float:
+        """Ждёт, пока накопится cost токенов, и забирает их. Возвращает время ожидания."""
+        cost = min(cost, self.capacity)
+        waited = 0.0
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= cost:
+                    self.tokens -= cost
+                    return waited
+                delay = (cost - self.tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+
+    def pause(self, seconds: float) -> None:
+        """
+        Telegram попросил подождать: следующий токен появится не раньше чем через seconds.
+        Несколько пауз подряд не складываются — действует самая длинная.
+        """
+        self._refill()
+        self.tokens = min(self.tokens, -seconds * self.rate)
+
+    def idle(self) -> bool:
+        self._refill()
+        return self.tokens >= self.capacity
+
+
+class OutboundQueue:
+    """
+    Все исходящие отправки в Telegram идут через send(): общее ведро на бота
+    и отдельное на каждый чат. На TelegramRetryAfter оба ведра ждут столько,
+    сколько сказал сервер, и отправка повторяется.
+    """
+
+    def __init__(self, global_rate: float, chat_rate: float, chat_burst: float, max_retries: int):
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self._global = TokenBucket(global_rate, global_rate)
+        self._chats: dict[int, TokenBucket] = {}
+        # отправки в один чат идут строго по очереди, включая повторы после RetryAfter
+        self._chat_turns: dict[int, asyncio.Lock] = {}
+        self.stats = {
+            "sent": 0,
+            "failed": 0,
+            "retries": 0,
+            "retry_after_seconds": 0.0,
+            "waited_seconds": 0.0,
+        }
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) > 1000:
+                # забываем чаты, которые давно ничего не отправляли
+                for cid in [cid for cid, b in self._chats.items() if b.idle() and not self._chat_turns[cid].locked()]:
+                    del self._chats[cid]
+                    del self._chat_turns[cid]
+            bucket = self._chats[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+            self._chat_turns[chat_id] = asyncio.Lock()
+        return bucket
+
+    async def send(self, chat_id: int, method, *args, cost: int = 1, **kwargs):
+        """
+        Вызывает method(*args, **kwargs) (например message.answer_document) с учётом лимитов.
+        cost — сколько сообщений это для Telegram (альбом = число картинок).
+        """
+        chat = self._chat_bucket(chat_id)
+        async with self._chat_turns[chat_id]:
+            attempt = 0
+            while True:
+                waited = await chat.acquire(cost)
+                waited += await self._global.acquire(cost)
+                self.stats["waited_seconds"] += waited
+                try:
+                    result = await method(*args, **kwargs)
+                except TelegramRetryAfter as e:
+                    attempt += 1
+                    self.stats["retries"] += 1
+                    self.stats["retry_after_seconds"] += e.retry_after
+                    if attempt > self.max_retries:
+                        self.stats["failed"] += 1
+                        raise
+                    print(f" Telegram: лимит для чата {chat_id}, ждём {e.retry_after} c (попытка {attempt})")
+                    # flood-wait может касаться всего бота — придерживаем и чат, и общее ведро
+                    chat.pause(e.retry_after)
+                    self._global.pause(e.retry_after)
+                    continue
+                except Exception:
+                    self.stats["failed"] += 1
+                    raise
+                self.stats["sent"] += 1
+                return result
+
+    async def answer(self, message, *args, **kwargs):
+        return await self.send(message.chat.id, message.answer, *args, **kwargs)
+
+    async def answer_document(self, message, *args, **kwargs):
+        return await self.send(message.chat.id, message.answer_document, *args, **kwargs)
+
+    async def answer_media_group(self, message, media, **kwargs):
+        return await self.send(message.chat.id, message.answer_media_group, media=media, cost=len(media), **kwargs)
+
+    def metrics(self) -> dict:
+        return dict(self.stats, chats=len(self._chats))
+
+
+outbound = OutboundQueue(
+    global_rate=config.tg_global_rate,
+    chat_rate=config.tg_chat_rate,
+    chat_burst=config.tg_chat_burst,
+    max_retries=config.tg_max_retries,
+)
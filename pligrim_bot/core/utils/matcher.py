@@ -0,0 +1,99 @@
+from collections import deque
+from functools import lru_cache
+from typing import Iterable
+
+
+class AliasMatcher:
+    """
+    Поиск сразу всех алиасов в строке за один проход (автомат Ахо–Корасик).
+    aliases: {каноническое имя: [варианты-подстроки]}.
+    hits(s) возвращает канонические имена, у которых хотя бы один вариант
+    встречается в s — то же, что any(a in s for a in variants) для каждого имени.
+    """
+
+    def __init__(self, aliases: dict[str, Iterable[str]]):
+        self.order = {canon: i for i, canon in enumerate(aliases)}
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        always = set()
+
+        # 1) бор из всех вариантов
+        outs: list[set[str]] = [set()]
+        for canon, variants in aliases.items():
+            for v in variants:
+                if not v:
+                    # пустая подстрока входит в любую строку
+                    always.add(canon)
+                    continue
+                state = 0
+                for ch in v:
+                    nxt = self._goto[state].get(ch)
+                    if nxt is None:
+                        nxt = len(self._goto)
+                        self._goto[state][ch] = nxt
+                        self._goto.append({})
+                        self._fail.append(0)
+                        outs.append(set())
+                    state = nxt
+                outs[state].add(canon)
+
+        # 2) ссылки неудач (BFS) и выходы по суффиксам
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f][ch] if state and ch in self._goto[f] else 0
+                outs[nxt] |= outs[self._fail[nxt]]
+
+        self._out = [frozenset(o) for o in outs]
+        self._always = frozenset(always)
+        self._total = len(self.order)
+
+    @classmethod
+    def from_words(cls, words: Iterable[str]) -> "AliasMatcher":
+        """Набор слов, каждое само себе каноническое имя."""
+        return cls({w: (w,) for w in words})
+
+    def hits(self, s: str) -> set[str]:
+        found = set(self._always)
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for ch in s:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found |= out[state]
+                if len(found) == self._total:
+                    break
+        return found
+
+    def any(self, s: str) -> bool:
+        if self._always:
+            return True
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for ch in s:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                return True
+        return False
+
+    def first(self, s: str) -> str | None:
+        """Первое по порядку aliases каноническое имя, найденное в s."""
+        found = self.hits(s)
+        if not found:
+            return None
+        return min(found, key=self.order.__getitem__)
+
+
+@lru_cache(maxsize=256)
+def words_matcher(words: tuple[str, ...]) -> AliasMatcher:
+    """Автомат для произвольного набора слов (например, ключевых слов типа пакета)."""
+    return AliasMatcher.from_words(words)
@@ -1,16 +1,68 @@
+from functools import lru_cache
+
 from pligrim_bot.config.constants import *
 
+_SPACES_RE = re.compile(r"[\s\u00A0\u202F]+")
+
+
+class NormForms:
+    """
+    Нормализованные формы одной строки:
+      spaces  — пробелы (в т.ч. неразрывные) схлопнуты, края обрезаны;
+      lower   — то же в нижнем регистре;
+      compact — нижний регистр без пробелов вообще;
+      title / pkg — как norm_title / norm_pkg (считаются при первом обращении).
+    """
+    __slots__ = ("raw", "spaces", "lower", "compact", "_title", "_pkg")
+
+    def __init__(self, raw: str):
+        self.raw = raw
+        self.spaces = _SPACES_RE.sub(" ", raw).strip()
+        self.lower = self.spaces.lower()
+        self.compact = self.lower.replace(" ", "")
+        self._title = None
+        self._pkg = None
+
+    @property
+    def title(self) -> str:
+        if self._title is None:
+            self._title = _norm_title(self.raw)
+        return self._title
+
+    @property
+    def pkg(self) -> str:
+        if self._pkg is None:
+            self._pkg = _norm_pkg(self.raw)
+        return self._pkg
+
+
+@lru_cache(maxsize=65536)
+def _norm_forms(raw: str) -> NormForms:
+    return NormForms(raw)
+
+
+def norm_forms(s) -> NormForms:
+    """
+    Все формы строки разом, с LRU-кэшем по исходному тексту:
+    одна и та же ячейка листа нормализуется один раз.
+    """
+    return _norm_forms("" if s is None else str(s))
+
+
 def normtxt(s: str) -> str:
-    return re.sub(r"[\s\u00A0\u202F]+", " ", (s or "")).strip()
+    return norm_forms(s or "").spaces
 
 def row_has_table_header(row: list[str]) -> bool:
     joined = " ".join((row or [])[:12])
     return any(h in joined for h in HEADER_HINTS)
 
 def clean(s: str) -> str:
-    return re.sub(r"\s+", " ", (s or "").replace("\xa0", " ")).strip()
+    return norm_forms(s or "").spaces
 
 def norm_title(s: str) -> str:
+    return norm_forms(s or "").title
+
+def _norm_title(s: str) -> str:
     s = (s or "").lower()
     s = s.replace("\xa0", " ").replace("\u202f", " ")
     s = re.sub(r"\s*/\s*", "/", s)
@@ -25,6 +77,9 @@ def norm_title(s: str) -> str:
     return s.strip()
 
 def norm_pkg(s: str) -> str:
+    return norm_forms(s or "").pkg
+
+def _norm_pkg(s: str) -> str:
     s = (s or "").lower()
     s = s.replace("\xa0", " ").replace("\u202f", " ")
     s = re.sub(r"\s*/\s*", "/", s)
@@ -35,10 +90,10 @@ def norm_pkg(s: str) -> str:
 
 def norm(s: str) -> str:
     # нижний регистр + убрать обычные/неразрывные/узкие пробелы и табы/переводы строк
-    return re.sub(r"[\s\u00A0\u202F]+", "", (s or "").lower())
+    return norm_forms(s or "").compact
 
-def n(s): return re.sub(r"[\s\u00A0\u202F]+", " ", ("" if s is None else str(s))).strip()
-def lc(s): return n(s).lower()
+def n(s): return norm_forms(s).spaces
+def lc(s): return norm_forms(s).lower
 
 def safe_cb_text(s: str) -> str:
     """Чтобы callback_data не ломалась из-за пробелов/двоеточий."""
@@ -46,3 +101,22 @@ def safe_cb_text(s: str) -> str:
 
 def row_text(row):
     return " ".join((cell or "").strip() for cell in row if cell).strip()
+
+def plural_nights(n) -> str:
+    if n is None or n == "":
+        return ""
+    try:
+        n = int(n)
+    except Exception:
+        return str(n)
+    x = abs(n) % 100
+    y = x % 10
+    if 11 <= x <= 14:
+        word = "ночей"
+    elif y == 1:
+        word = "ночь"
+    elif 2 <= y <= 4:
+        word = "ночи"
+    else:
+        word = "ночей"
+    return f"{n} {word}"
@@ -0,0 +1,60 @@
+import threading
+from functools import lru_cache
+
+from PIL import Image, ImageFont
+
+from pligrim_bot.config.constants import TTF_REGULAR
+
+# Размеры шрифта, которыми рисуется ваучер (render_voucher_page1_png)
+VOUCHER_FONT_SIZES = (22, 26)
+
+# Декодированные картинки: (путь, режим) → Image. Эти объекты никто не рисует
+# и не изменяет — наружу отдаются только копии.
+_images: dict[tuple[str, str], Image.Image] = {}
+_lock = threading.Lock()
+_preloaded = False
+
+
+def _base_image(path: str, mode: str) -> Image.Image:
+    key = (path, mode)
+    img = _images.get(key)
+    if img is None:
+        with _lock:
+            img = _images.get(key)
+            if img is None:
+                with Image.open(path) as src:
+                    img = src.convert(mode)
+                img.load()
+                _images[key] = img
+    return img
+
+
+def image_copy(path: str, mode: str = "RGBA") -> Image.Image:
+    """Копия закэшированной картинки — на ней можно рисовать."""
+    return _base_image(path, mode).copy()
+
+
+@lru_cache(maxsize=None)
+def font(sz):
+    try:
+        return ImageFont.truetype(TTF_REGULAR, sz)
+    except Exception:
+        return ImageFont.load_default()
+
+
+def preload(template_paths, page2_paths) -> None:
+    """
+    Декодирует шаблон ваучера, фоны второй страницы и шрифты один раз.
+    Вызывается при старте пула рендера; при fork процессы получают готовый кэш.
+    """
+    global _preloaded
+    if _preloaded:
+        return
+    for path in template_paths:
+        _base_image(path, "RGBA")
+    for path in page2_paths:
+        _base_image(path, "RGB")
+    for sz in VOUCHER_FONT_SIZES:
+        font(sz)
+    _preloaded = True
+    print(f" Ассеты ваучера загружены: {len(_images)} изображений, {len(VOUCHER_FONT_SIZES)} шрифта")
@@ -0,0 +1,33 @@
+import asyncio
+import io
+import zipfile
+
+from pligrim_bot.core.voucher import pdf
+from pligrim_bot.core.voucher.pool import render_voucher_pdf_pages
+
+
+async def render_all(payloads: list[dict], bg_index: int = -1) -> list[list[pdf.PdfPage]]:
+    """
+    Рендерит ваучеры всех комнат параллельно (через пул процессов).
+    Порядок результата совпадает с порядком payloads; при ошибке остальные задачи отменяются.
+    """
+    jobs = [asyncio.create_task(render_voucher_pdf_pages(p, bg_index)) for p in payloads]
+    try:
+        return await asyncio.gather(*jobs)
+    finally:
+        for job in jobs:
+            job.cancel()
+
+
+def merged_pdf(rooms: list[list[pdf.PdfPage]]) -> bytes:
+    """Один PDF со всеми ваучерами пакета подряд."""
+    return pdf.build_pdf([page for pages in rooms for page in pages])
+
+
+def zip_archive(files: list[tuple[str, bytes]]) -> bytes:
+    """ZIP из готовых PDF. Без сжатия: страницы уже в JPEG, deflate их не уменьшит."""
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_STORED) as zf:
+        for name, data in files:
+            zf.writestr(name, data)
+    return buf.getvalue()
@@ -4,7 +4,8 @@ from datetime import datetime
 from pligrim_bot.config.constants import TIME_RE, FLIGHT_RE
 from pligrim_bot.core.utils.date_utils import norm_date_str, norm_date
 from pligrim_bot.core.utils.validation import *
-from pligrim_bot.core.voucher.render import plural_nights
+from pligrim_bot.core.utils.text_utils import plural_nights
+from pligrim_bot.data.snapshots import sheet_values
 
 
 def base_payload_from(voucher: dict) -> dict:
@@ -110,6 +111,29 @@ def _parse_from_date(dates_range: str) -> datetime | None:
 
     return None
 
+# Какие коды рейсов подходят под направление: (туда, обратно)
+FLIGHT_CODES_BY_TOKEN = {
+    "AJMA": (("KC265", "KC8201"), ("KC264",)),          # out AJ, back MA
+    "AMJA": (("KC263",),          ("KC266", "KC8202")), # out AM, back JA
+    "AJJA": (("KC265", "KC8201"), ("KC266", "KC8202")), # out AJ, back JA
+}
+
+def flight_payload(dep, ret, out_flight, out_t1, out_t2, back_flight, back_t1, back_t2) -> dict:
+    return {
+        "depart_date": dep,
+        "depart_flight": f"Рейс {out_flight}",
+        "depart_time1": out_t1,
+        "depart_date1": dep,
+        "depart_time2": out_t2,
+        "depart_date2": dep,
+        "return_date": ret,
+        "return_flight": f"Рейс {back_flight}",
+        "return_time1": back_t1,
+        "return_date1": ret,
+        "return_time2": back_t2,
+        "return_date2": ret,
+    }
+
 def assemble_voucher(OUT_AJ, OUT_AM, RET_JA, RET_MA, dep, ret, token):
     dep = norm_date_str(dep); ret = norm_date_str(ret)
 
@@ -125,106 +149,27 @@ def assemble_voucher(OUT_AJ, OUT_AM, RET_JA, RET_MA, dep, ret, token):
     if not o or not b:
         return None
 
-    return {
-        "depart_date": dep,
-        "depart_flight": f"Рейс {o['flight']}",
-        "depart_time1": o["t1"],
-        "depart_date1": dep,
-        "depart_time2": o["t2"],
-        "depart_date2": dep,
-        "return_date": ret,
-        "return_flight": f"Рейс {b['flight']}",
-        "return_time1": b["t1"],
-        "return_date1": ret,
-        "return_time2": b["t2"],
-        "return_date2": ret,
-    }
+    return flight_payload(dep, ret, o["flight"], o["t1"], o["t2"], b["flight"], b["t1"], b["t2"])
 
 def assemble_voucher_from_one_row_style(ws, dep_date, ret_date, token):
     """
-    Идём по каждой строке: если в строке есть искомые даты, собираем ваучер.
+    Ваучер, если обе искомые даты стоят в одной строке расписания.
     token:
       'AJMA' — ALA→JED  /  MED→ALA  (KC265/KC8201, KC264)
       'AMJA' — ALA→MED  /  JED→ALA  (KC263, KC266/KC8202)
       'AJJA' — ALA→JED  /  JED→ALA  (KC265/KC8201, KC266/KC8202)
     """
-    dep_date = norm_date_str(dep_date)
-    ret_date = norm_date_str(ret_date)
-    rows = ws.get_all_values()
-
-    # какие коды подходят под направление
-    want = {
-        "AJMA": (("KC265","KC8201"), ("KC264",)),          # out AJ, back MA
-        "AMJA": (("KC263",),         ("KC266","KC8202")),  # out AM, back JA
-        "AJJA": (("KC265","KC8201"), ("KC266","KC8202")),  # out AJ, back JA
-    }.get(token, ((),()))
-
-    for row in rows:
-        segs = extract_segments_from_row(row)
-        if not segs:
-            continue
-        # сгруппируем по коду рейса (в строке каждый код встречается обычно 0/1 раз)
-        by_code = {s["flight"]: s for s in segs}
-
-        # подберём нужные сегменты с учётом нескольких возможных кодов
-        dep_seg = None
-        for code in want[0]:
-            s = by_code.get(code)
-            if s and s["date"] == dep_date:
-                dep_seg = s
-                break
-
-        ret_seg = None
-        for code in want[1]:
-            s = by_code.get(code)
-            if s and s["date"] == ret_date:
-                ret_seg = s
-                break
-
-        # если обе части нашлись в ОДНОЙ строке — это то, что тебе нужно
-        if dep_seg and ret_seg:
-            return {
-                "depart_date": dep_date,
-                "depart_flight": f"Рейс {dep_seg['flight']}",
-                "depart_time1": dep_seg["dep"],
-                "depart_date1": dep_date,
-                "depart_time2": dep_seg["arr"],
-                "depart_date2": dep_date,
-
-                "return_date": ret_date,
-                "return_flight": f"Рейс {ret_seg['flight']}",
-                "return_time1": ret_seg["dep"],
-                "return_date1": ret_date,
-                "return_time2": ret_seg["arr"],
-                "return_date2": ret_date,
-            }
-
-    return None  # в одной строке не нашли — можно падать в резервную логику
+    from pligrim_bot.core.voucher.flight_index import flight_schedule
+    return flight_schedule(ws).one_row_voucher(dep_date, ret_date, token)
 
 def build_maps_smart(ws):
     """
-    Заполняет карты OUT_AJ / OUT_AM / RET_JA / RET_MA, проходя по всей таблице.
+    Карты OUT_AJ / OUT_AM / RET_JA / RET_MA по всей таблице (из индекса расписания).
     Работает и с KC 264/8201 (с пробелом), и с обычными KC264/8201.
+    Карты общие для снимка листа — изменять их нельзя.
     """
-    data = ws.get_all_values()
-    OUT_AJ, OUT_AM, RET_JA, RET_MA = {}, {}, {}, {}
-
-    def put(map_, date, flight, dep, arr):
-        d = norm_date_str(date)
-        if d and dep and arr:
-            map_[d] = {"flight": flight, "t1": dep, "t2": arr}
-
-    for row in data[1:]:
-        segs = extract_segments_from_row(row)
-        for s in segs:
-            f = s["flight"]
-            if   f in ("KC265", "KC8201"): put(OUT_AJ, s["date"], f, s["dep"], s["arr"])
-            elif f == "KC263":            put(OUT_AM, s["date"], f, s["dep"], s["arr"])
-            elif f in ("KC266", "KC8202"):put(RET_JA, s["date"], f, s["dep"], s["arr"])
-            elif f == "KC264":            put(RET_MA, s["date"], f, s["dep"], s["arr"])
-
-    print(f" build_maps(): ALA→JED={len(OUT_AJ)}, JED→ALA={len(RET_JA)}, ALA→MED={len(OUT_AM)}, MED→ALA={len(RET_MA)}")
-    return OUT_AJ, OUT_AM, RET_JA, RET_MA
+    from pligrim_bot.core.voucher.flight_index import flight_schedule
+    return flight_schedule(ws).maps
 
 def build_maps(ws):
     """
@@ -235,7 +180,7 @@ def build_maps(ws):
       KC264 — MED→ALA
       KC8201 / KC8202 — чартеры
     """
-    data = ws.get_all_values()
+    data = sheet_values(ws)
 
     OUT_AJ, OUT_AM, RET_JA, RET_MA = {}, {}, {}, {}
 
@@ -277,10 +222,11 @@ def build_maps(ws):
 def cell(row, i):
     return (row[i] if 0 <= i < len(row) else "") or ""
 
-def find_left_date_in_row(row, i, lookback=3):
+def find_left_date_in_row(row, i, lookback=3, dates=None):
     # дата обычно в i-1, но надёжнее проверить несколько ячеек влево
+    # dates — уже нормализованные даты строки {колонка: 'dd.mm.yyyy'} (DateGrid.cell_norm)
     for k in range(1, lookback+1):
-        d = norm_date(cell(row, i-k))
+        d = dates.get(i-k) if dates is not None else norm_date(cell(row, i-k))
         if d:
             return d
     return None
@@ -289,7 +235,7 @@ def safe_time(s):
     s = (s or "").strip()
     return s if TIME_RE.match(s) else ""
 
-def extract_segments_from_row(row):
+def extract_segments_from_row(row, dates=None):
     """
     Возвращает список сегментов из строки:
     [{flight:'KC265', date:'dd.mm.yyyy', dep:'hh:mm', arr:'hh:mm', route:'ALA JED'}, ...]
@@ -302,7 +248,7 @@ def extract_segments_from_row(row):
             continue
         flight = ("KC" + m.group(1)).upper()  # нормализуем KC 264 -> KC264
 
-        date = find_left_date_in_row(row, i, lookback=3)
+        date = find_left_date_in_row(row, i, lookback=3, dates=dates)
         dep  = safe_time(cell(row, i+1))
         arr  = safe_time(cell(row, i+2))
         route = (cell(row, i+3) or "").strip().upper()
@@ -0,0 +1,98 @@
+from pligrim_bot.core.parsers.date_grid import date_grid
+from pligrim_bot.core.utils.date_utils import norm_date_str
+from pligrim_bot.core.voucher.builder import (
+    FLIGHT_CODES_BY_TOKEN, assemble_voucher, extract_segments_from_row, flight_payload,
+)
+from pligrim_bot.data.snapshots import get_snapshot
+
+
+class FlightScheduleIndex:
+    """
+    Лист 'расписание рейсов', разобранный за один проход:
+      segments[(код, дата)]         — сегмент рейса (последняя строка побеждает, как в build_maps_smart);
+      maps                          — OUT_AJ / OUT_AM / RET_JA / RET_MA для assemble_voucher;
+      one_row[(dep, ret, token)]    — (строка, туда, обратно): обе части в ОДНОЙ строке,
+                                      первая такая строка, как в assemble_voucher_from_one_row_style.
+    Строится один раз на снимок листа — новый снимок, новый индекс.
+    """
+
+    def __init__(self, data: list[list[str]]):
+        self.segments: dict[tuple[str, str], dict] = {}
+        self.one_row: dict[tuple[str, str, str], tuple[int, dict, dict]] = {}
+        OUT_AJ, OUT_AM, RET_JA, RET_MA = {}, {}, {}, {}
+
+        # даты ячеек уже нормализованы в сетке листа — раскладываем их по строкам
+        row_dates: dict[int, dict[int, str]] = {}
+        for (r, c), nd in date_grid(data).cell_norm.items():
+            row_dates.setdefault(r, {})[c] = nd
+
+        for r, row in enumerate(data):
+            segs = extract_segments_from_row(row, row_dates.get(r, {}))
+            if not segs:
+                continue
+
+            # карты направлений — без первой строки (шапка), как в build_maps_smart
+            if r > 0:
+                for s in segs:
+                    f = s["flight"]
+                    self.segments[(f, s["date"])] = s
+                    leg = {"flight": f, "t1": s["dep"], "t2": s["arr"]}
+                    if   f in ("KC265", "KC8201"): OUT_AJ[s["date"]] = leg
+                    elif f == "KC263":            OUT_AM[s["date"]] = leg
+                    elif f in ("KC266", "KC8202"):RET_JA[s["date"]] = leg
+                    elif f == "KC264":            RET_MA[s["date"]] = leg
+
+            # в строке каждый код встречается обычно 0/1 раз
+            by_code = {s["flight"]: s for s in segs}
+            for token, (out_codes, back_codes) in FLIGHT_CODES_BY_TOKEN.items():
+                outs = self._legs_by_date(by_code, out_codes)
+                backs = self._legs_by_date(by_code, back_codes)
+                for dep, o in outs.items():
+                    for ret, b in backs.items():
+                        self.one_row.setdefault((dep, ret, token), (r, o, b))
+
+        self.maps = (OUT_AJ, OUT_AM, RET_JA, RET_MA)
+
+    @staticmethod
+    def _legs_by_date(by_code: dict, codes: tuple[str, ...]) -> dict[str, dict]:
+        # на одну дату берём первый по порядку подходящий код
+        legs = {}
+        for code in codes:
+            s = by_code.get(code)
+            if s:
+                legs.setdefault(s["date"], s)
+        return legs
+
+    def segment(self, flight: str, date: str) -> dict | None:
+        return self.segments.get((flight, norm_date_str(date)))
+
+    def row_with_both_legs(self, dep: str, ret: str, token: str) -> int | None:
+        hit = self.one_row.get((norm_date_str(dep), norm_date_str(ret), token))
+        return hit[0] if hit else None
+
+    def one_row_voucher(self, dep: str, ret: str, token: str) -> dict | None:
+        dep, ret = norm_date_str(dep), norm_date_str(ret)
+        hit = self.one_row.get((dep, ret, token))
+        if not hit:
+            return None
+        _, o, b = hit
+        return flight_payload(dep, ret, o["flight"], o["dep"], o["arr"], b["flight"], b["dep"], b["arr"])
+
+    def voucher(self, dep: str, ret: str, token: str) -> dict | None:
+        """Сначала обе части из одной строки, иначе — по картам направлений."""
+        return self.one_row_voucher(dep, ret, token) or assemble_voucher(*self.maps, dep, ret, token)
+
+
+def flight_schedule(ws) -> FlightScheduleIndex:
+    """Индекс расписания для текущего снимка листа (пересобирается только с новым снимком)."""
+    snap = get_snapshot(ws)
+
+    def build():
+        idx = FlightScheduleIndex(snap.values)
+        OUT_AJ, OUT_AM, RET_JA, RET_MA = idx.maps
+        print(f" Индекс расписания '{snap.title}': сегментов={len(idx.segments)}, "
+              f"в одной строке={len(idx.one_row)}, "
+              f"ALA→JED={len(OUT_AJ)}, JED→ALA={len(RET_JA)}, ALA→MED={len(OUT_AM)}, MED→ALA={len(RET_MA)}")
+        return idx
+
+    return snap.memo("flight_schedule", build)
@@ -0,0 +1,91 @@
+import io
+import threading
+from dataclasses import dataclass
+
+from PIL import Image
+
+from pligrim_bot.core.voucher import assets
+
+# Минимальный PDF-писатель: каждая страница — одна JPEG-картинка во весь лист.
+# Pillow сохраняет RGB в PDF точно так же (DCTDecode, 72 dpi), но не умеет
+# переиспользовать уже закодированную страницу — а фон второй страницы
+# у ваучера всегда один из трёх.
+
+
+@dataclass(frozen=True)
+class PdfPage:
+    """Закодированная страница: JPEG + размер в пикселях (= пунктам при 72 dpi)."""
+    width: int
+    height: int
+    jpeg: bytes
+
+
+def encode_page(img: Image.Image) -> PdfPage:
+    buf = io.BytesIO()
+    img.convert("RGB").save(buf, "JPEG")
+    return PdfPage(width=img.width, height=img.height, jpeg=buf.getvalue())
+
+
+_fragments: dict[str, PdfPage] = {}
+_lock = threading.Lock()
+
+
+def background_page(path: str) -> PdfPage:
+    """Страница-фон (вторая страница ваучера), закодированная один раз на процесс."""
+    page = _fragments.get(path)
+    if page is None:
+        with _lock:
+            page = _fragments.get(path)
+            if page is None:
+                page = encode_page(assets.image_copy(path, "RGB"))
+                _fragments[path] = page
+    return page
+
+
+def build_pdf(pages: list[PdfPage]) -> bytes:
+    """Склеивает готовые страницы в один PDF-документ."""
+    out = io.BytesIO()
+    offsets: list[int] = []
+
+    def obj(body: bytes, stream: bytes | None = None) -> None:
+        offsets.append(out.tell())
+        out.write(f"{len(offsets)} 0 obj\n".encode())
+        out.write(body)
+        if stream is not None:
+            out.write(b"\nstream\n")
+            out.write(stream)
+            out.write(b"\nendstream")
+        out.write(b"\nendobj\n")
+
+    out.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    # 1 — каталог, 2 — дерево страниц, дальше по три объекта на страницу
+    page_ids = [3 + i * 3 for i in range(len(pages))]
+    obj(b"<< /Type /Catalog /Pages 2 0 R >>")
+    kids = " ".join(f"{pid} 0 R" for pid in page_ids)
+    obj(f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>".encode())
+
+    for pid, page in zip(page_ids, pages):
+        image_id, content_id = pid + 1, pid + 2
+        obj(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {page.width} {page.height}] "
+            f"/Resources << /XObject << /Im0 {image_id} 0 R >> >> "
+            f"/Contents {content_id} 0 R >>".encode()
+        )
+        obj(
+            f"<< /Type /XObject /Subtype /Image /Width {page.width} /Height {page.height} "
+            f"/ColorSpace /DeviceRGB /BitsPerComponent 8 /Filter /DCTDecode "
+            f"/Length {len(page.jpeg)} >>".encode(),
+            page.jpeg,
+        )
+        content = f"q {page.width} 0 0 {page.height} 0 0 cm /Im0 Do Q".encode()
+        obj(f"<< /Length {len(content)} >>".encode(), content)
+
+    xref = out.tell()
+    out.write(f"xref\n0 {len(offsets) + 1}\n".encode())
+    out.write(b"0000000000 65535 f \n")
+    for off in offsets:
+        out.write(f"{off:010d} 00000 n \n".encode())
+    out.write(f"trailer\n<< /Size {len(offsets) + 1} /Root 1 0 R >>\n".encode())
+    out.write(f"startxref\n{xref}\n%%EOF\n".encode())
+    return out.getvalue()
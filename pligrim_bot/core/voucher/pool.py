@@ -0,0 +1,60 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from pligrim_bot.config.app_config import config
+from pligrim_bot.core.voucher.pdf import PdfPage
+from pligrim_bot.core.voucher.render import preload_assets, render_voucher_pages, render_voucher_pdf_bytes
+
+# Pillow держит GIL, поэтому ваучеры рендерятся в отдельных процессах,
+# а не в цикле событий aiogram.
+_executor: ProcessPoolExecutor | None = None
+_slots: asyncio.Semaphore | None = None
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # initializer нужен для spawn; при fork ассеты уже загружены родителем в start()
+        _executor = ProcessPoolExecutor(max_workers=config.render_workers, initializer=preload_assets)
+    return _executor
+
+
+def _get_slots() -> asyncio.Semaphore:
+    # back-pressure: не больше render_queue задач одновременно в пуле,
+    # остальные ждут здесь и не копят payload'ы в очереди процессов
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(config.render_queue)
+    return _slots
+
+
+def start() -> None:
+    """
+    Поднимает процессы пула заранее — при старте бота, пока нет фоновых потоков
+    (fork процесса с работающими потоками небезопасен).
+    """
+    preload_assets()
+    _get_executor().submit(os.getpid).result()
+    print(f" Пул рендера запущен: {config.render_workers} процессов")
+
+
+async def render_voucher_pdf(payload: dict, bg_index: int = -1) -> bytes:
+    """Рендерит ваучер одной комнаты в пуле процессов и возвращает байты PDF."""
+    loop = asyncio.get_running_loop()
+    async with _get_slots():
+        return await loop.run_in_executor(_get_executor(), render_voucher_pdf_bytes, payload, bg_index)
+
+
+async def render_voucher_pdf_pages(payload: dict, bg_index: int = -1) -> list[PdfPage]:
+    """То же, но возвращает страницы — для склейки нескольких ваучеров в один PDF."""
+    loop = asyncio.get_running_loop()
+    async with _get_slots():
+        return await loop.run_in_executor(_get_executor(), render_voucher_pages, payload, bg_index)
+
+
+def shutdown() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -1,9 +1,11 @@
 import os
 import uuid
 import re
-from PIL import Image, ImageDraw, ImageFont
-from pligrim_bot.config.constants import BBOX, TMP_DIR, TTF_REGULAR, TTF_PATH
+from PIL import Image, ImageDraw
+from pligrim_bot.config.constants import BBOX, TMP_DIR, TTF_PATH
 from pligrim_bot.core.parsers.transport_parser import need_train
+from pligrim_bot.core.voucher import assets, pdf
+from pligrim_bot.core.voucher.assets import font
 
 # Правильные пути к файлам
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -60,9 +62,9 @@ def build_filename_from_payload(payload: dict) -> str:
     raw = re.sub(r'[\\:*?"<>|]+', "", raw)
     return raw[:80]
 
-def render_voucher_page1_png(payload: dict) -> str:
-    """Рендерит первую страницу ваучера"""
-    img = Image.open(BG_PATH).convert("RGBA")
+def render_voucher_page1(payload: dict) -> Image.Image:
+    """Рендерит первую страницу ваучера в память (RGBA)"""
+    img = assets.image_copy(BG_PATH, "RGBA")
     draw = ImageDraw.Draw(img)
     FONT_PEOPLE = font(26)
     FONT_MAIN = font(22)
@@ -91,6 +93,11 @@ def render_voucher_page1_png(payload: dict) -> str:
         if val not in ("", None):
             draw_value(draw, str(val), box, FONT_MAIN)
 
+    return img
+
+def render_voucher_page1_png(payload: dict) -> str:
+    """Рендерит первую страницу ваучера в PNG-файл в TMP_DIR"""
+    img = render_voucher_page1(payload)
     file_stem = build_filename_from_payload(payload)
     out = os.path.join(TMP_DIR, f"{file_stem}_p1.png")
     img.save(out, "PNG")
@@ -108,54 +115,65 @@ def draw_value(draw, text, box, font, align="left"):
         x = x1
     draw.text((x, y1), s, font=font, fill=(20, 20, 20))
 
-def plural_nights(n) -> str:
-    if n is None or n == "":
-        return ""
-    try:
-        n = int(n)
-    except Exception:
-        return str(n)
-    x = abs(n) % 100
-    y = x % 10
-    if 11 <= x <= 14:
-        word = "ночей"
-    elif y == 1:
-        word = "ночь"
-    elif 2 <= y <= 4:
-        word = "ночи"
-    else:
-        word = "ночей"
-    return f"{n} {word}"
-
-def font(sz):
-    try:
-        return ImageFont.truetype(TTF_REGULAR, sz)
-    except Exception:
-        return ImageFont.load_default()
-
 def load_font(size):
     return font(size)
 
-# --- ИСПРАВЛЕННАЯ ФУНКЦИЯ ---
-def build_voucher_pdf(page1_png: str, city1: str | None, transfer_raw: str | None,
-                      out_pdf_path: str, bg_index: int = -1) -> str:
+def page2_background_path(city1: str | None, transfer_raw: str | None, bg_index: int = -1) -> str:
     """
-    Создает 2-страничный PDF ваучера.
+    Фон второй страницы.
     :param bg_index: Номер фона (0, 1, 2). Если -1, выбирает авто.
     """
     if 0 <= bg_index < len(AVAILABLE_BACKGROUNDS):
         # Берем фон по выбору пользователя
-        page2_bg = AVAILABLE_BACKGROUNDS[bg_index]
-    else:
-        # Автовыбор (старая логика)
-        page2_bg = pick_page2_bg(city1, transfer_raw)
+        return AVAILABLE_BACKGROUNDS[bg_index]
+    # Автовыбор (старая логика)
+    return pick_page2_bg(city1, transfer_raw)
 
-    p1 = Image.open(page1_png).convert("RGB")
-    p2 = Image.open(page2_bg).convert("RGB")
+def voucher_pdf_bytes(page1: Image.Image, city1: str | None, transfer_raw: str | None,
+                      bg_index: int = -1) -> bytes:
+    """
+    Собирает 2-страничный PDF ваучера в памяти. Кодируется только page1,
+    вторая страница берётся готовой из кэша pdf.background_page.
+    """
+    p2 = pdf.background_page(page2_background_path(city1, transfer_raw, bg_index))
+    return pdf.build_pdf([pdf.encode_page(page1), p2])
 
-    p1.save(out_pdf_path, "PDF", save_all=True, append_images=[p2])
+# --- ИСПРАВЛЕННАЯ ФУНКЦИЯ ---
+def build_voucher_pdf(page1_png: str, city1: str | None, transfer_raw: str | None,
+                      out_pdf_path: str, bg_index: int = -1) -> str:
+    """
+    Создает 2-страничный PDF ваучера из PNG первой страницы на диске.
+    :param bg_index: Номер фона (0, 1, 2). Если -1, выбирает авто.
+    """
+    with Image.open(page1_png) as p1:
+        data = voucher_pdf_bytes(p1, city1, transfer_raw, bg_index)
+    with open(out_pdf_path, "wb") as f:
+        f.write(data)
     return out_pdf_path
 
+def preload_assets() -> None:
+    """Шаблон v1.png, все фоны AVAILABLE_BACKGROUNDS и шрифты — в кэш; фоны сразу кодируются в страницы PDF."""
+    assets.preload([BG_PATH], AVAILABLE_BACKGROUNDS)
+    for path in AVAILABLE_BACKGROUNDS:
+        pdf.background_page(path)
+
+def render_voucher_pages(payload: dict, bg_index: int = -1) -> list[pdf.PdfPage]:
+    """
+    Задача для пула рендера (core/voucher/pool.py): payload одной комнаты → две готовые
+    страницы PDF. Страницы нескольких комнат можно склеить в один документ (pdf.build_pdf).
+    """
+    page1 = pdf.encode_page(render_voucher_page1(payload))
+    page2 = pdf.background_page(page2_background_path(payload.get("city1"), payload.get("transfer"), bg_index))
+    return [page1, page2]
+
+def render_voucher_pdf_bytes(payload: dict, bg_index: int = -1) -> bytes:
+    """
+    Задача для пула рендера (core/voucher/pool.py): payload одной комнаты → байты PDF.
+    Выполняется в отдельном процессе, поэтому принимает и возвращает только простые данные.
+    Ничего не пишет на диск.
+    """
+    return pdf.build_pdf(render_voucher_pages(payload, bg_index))
+
 def generate_ticket(output_path, data):
     # (Оставляем заглушку или ваш старый код билета, он не влияет на ошибку)
     pass
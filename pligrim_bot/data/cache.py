@@ -1,5 +1,134 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Any, Iterator
 
-from typing import Dict
+from pligrim_bot.config.app_config import config
 
-PREVIEW_CACHE: Dict[str, dict] = {}  # cache_id -> {"voucher":..., "pkg_title":..., "page2_png":...}
-EDIT_STATE: Dict[int, dict] = {}     # user_id -> {"cache_id":..., "field":...}
+
+def approx_size(obj: Any) -> int:
+    """Примерный объём объекта в байтах вместе с вложенными dict/list/tuple/set."""
+    seen: set[int] = set()
+    stack = [obj]
+    total = 0
+    while stack:
+        o = stack.pop()
+        if id(o) in seen:
+            continue
+        seen.add(id(o))
+        total += sys.getsizeof(o)
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            stack.extend(o)
+    return total
+
+
+class SessionStore(MutableMapping):
+    """
+    Словарь сессий пользователей с ограничениями:
+      - запись, к которой не обращались ttl секунд, пропадает;
+      - записей не больше max_entries, а их примерный объём не больше max_bytes —
+        лишние вытесняются, начиная с давно не используемых (LRU).
+    Объём записи считается при записи (store[key] = value); правки вложенного
+    dict на месте его не меняют — для учёта нужно присвоить значение заново.
+    """
+
+    def __init__(self, name: str, ttl: float, max_entries: int, max_bytes: int):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # key -> (value, last_used, size); порядок — от давно не используемых к свежим
+        self._items: OrderedDict[Any, tuple[Any, float, int]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "evicted": 0,
+        }
+
+    def _drop(self, key: Any) -> None:
+        _, _, size = self._items.pop(key)
+        self._bytes -= size
+
+    def _expire(self, now: float) -> None:
+        # ttl общий для всех записей, поэтому просроченные — всегда в начале
+        while self._items:
+            key, (_, used, _) = next(iter(self._items.items()))
+            if now - used <= self.ttl:
+                break
+            self._drop(key)
+            self.stats["expired"] += 1
+
+    def __getitem__(self, key: Any) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            item = self._items.get(key)
+            if item is None:
+                self.stats["misses"] += 1
+                raise KeyError(key)
+            value, _, size = item
+            self._items[key] = (value, now, size)
+            self._items.move_to_end(key)
+            self.stats["hits"] += 1
+            return value
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        now = time.monotonic()
+        size = approx_size(value)
+        with self._lock:
+            if key in self._items:
+                self._drop(key)
+            self._items[key] = (value, now, size)
+            self._bytes += size
+            self._expire(now)
+            # новую запись не вытесняем, даже если она одна больше лимита
+            while len(self._items) > 1 and (len(self._items) > self.max_entries or self._bytes > self.max_bytes):
+                oldest = next(iter(self._items))
+                self._drop(oldest)
+                self.stats["evicted"] += 1
+
+    def __delitem__(self, key: Any) -> None:
+        with self._lock:
+            self._drop(key)
+
+    def __iter__(self) -> Iterator[Any]:
+        with self._lock:
+            self._expire(time.monotonic())
+            return iter(list(self._items))
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._expire(time.monotonic())
+            return len(self._items)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def metrics(self) -> dict:
+        with self._lock:
+            self._expire(time.monotonic())
+            return dict(self.stats, name=self.name, entries=len(self._items), bytes=self._bytes)
+
+
+def session_store(name: str) -> SessionStore:
+    """Хранилище сессий с лимитами из конфига (SESSION_TTL, SESSION_MAX_ENTRIES, SESSION_MAX_MB)."""
+    return SessionStore(
+        name,
+        ttl=config.session_ttl,
+        max_entries=config.session_max_entries,
+        max_bytes=int(config.session_max_mb * 1024 * 1024),
+    )
+
+
+PREVIEW_CACHE = session_store("preview")  # cache_id -> {"voucher":..., "pkg_title":..., "page2_png":...}
+EDIT_STATE = session_store("edit_state")  # user_id -> {"cache_id":..., "field":...}
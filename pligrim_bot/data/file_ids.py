@@ -0,0 +1,76 @@
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+from aiogram.types import FSInputFile
+
+from pligrim_bot.config.app_config import config
+
+
+class FileIdCache:
+    """
+    file_id уже загруженных в Telegram файлов, чтобы не отправлять их заново.
+    Ключ — бот + путь + хэш содержимого: изменился файл — загрузится заново.
+    Хранится в JSON и переживает перезапуск бота.
+    """
+
+    def __init__(self, path: Path, bot_id: str):
+        self.path = path
+        self.bot_id = bot_id
+        self._lock = threading.Lock()
+        self._hashes: dict[str, tuple[float, str]] = {}
+        self._items: dict[str, str] = self._read()
+
+    def _read(self) -> dict[str, str]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return dict(json.load(f))
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f" Кэш file_id повреждён, начинаем заново: {e}")
+            return {}
+
+    def _write(self) -> None:
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._items, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+
+    def _content_hash(self, path: str) -> str:
+        # хэш пересчитываем, только если файл изменился по mtime
+        mtime = os.path.getmtime(path)
+        cached = self._hashes.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        with open(path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:16]
+        self._hashes[path] = (mtime, digest)
+        return digest
+
+    def key(self, path: str) -> str:
+        rel = os.path.relpath(os.path.abspath(path), config.project_root)
+        return f"{self.bot_id}:{rel}:{self._content_hash(path)}"
+
+    def get(self, path: str) -> str | None:
+        with self._lock:
+            return self._items.get(self.key(path))
+
+    def put(self, path: str, file_id: str) -> None:
+        with self._lock:
+            self._items[self.key(path)] = file_id
+            self._write()
+
+    def forget(self, path: str) -> None:
+        with self._lock:
+            if self._items.pop(self.key(path), None) is not None:
+                self._write()
+
+    def input_file(self, path: str) -> str | FSInputFile:
+        """file_id, если файл уже загружали, иначе FSInputFile для загрузки."""
+        return self.get(path) or FSInputFile(path)
+
+
+file_id_cache = FileIdCache(config.tmp_dir / "file_ids.json", bot_id=config.bot_token.split(":")[0])
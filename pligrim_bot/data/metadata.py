@@ -0,0 +1,145 @@
+import difflib
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+from pligrim_bot.config.app_config import config
+from pligrim_bot.config.settings import get_google_client
+from pligrim_bot.core.utils.text_utils import norm_title
+from pligrim_bot.data.revisions import revision_tracker
+
+
+@dataclass
+class SpreadsheetMeta:
+    """Открытая таблица и индексы её листов: по названию, нормализованному названию и id."""
+    spreadsheet: Any
+    worksheets: list
+    by_title: dict = field(default_factory=dict)
+    by_norm: dict = field(default_factory=dict)
+    by_id: dict = field(default_factory=dict)
+    revision: str | None = None
+    fetched_at: float = field(default_factory=time.monotonic)
+    _fuzzy: dict = field(default_factory=dict, repr=False)
+
+    def __post_init__(self):
+        for ws in self.worksheets:
+            self.by_title.setdefault(ws.title, ws)
+            self.by_norm.setdefault(norm_title(ws.title), ws)
+            self.by_id[int(ws.id)] = ws
+
+    @property
+    def titles(self) -> list[str]:
+        return [ws.title for ws in self.worksheets]
+
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_at
+
+    def find(self, wanted_title: str):
+        """Точное совпадение → нормализованное → fuzzy. None, если ничего не подошло."""
+        ws = self.by_title.get(wanted_title)
+        if ws is not None:
+            return ws
+
+        ws = self.by_norm.get(norm_title(wanted_title))
+        if ws is not None:
+            return ws
+
+        if wanted_title not in self._fuzzy:
+            guess = difflib.get_close_matches(wanted_title, self.titles, n=1, cutoff=0.65)
+            self._fuzzy[wanted_title] = guess[0] if guess else None
+        guess = self._fuzzy[wanted_title]
+        if guess is None:
+            return None
+        print(f"[WARN] Worksheet '{wanted_title}' not found, using close match '{guess}'")
+        return self.by_title[guess]
+
+
+class MetadataRegistry:
+    """
+    Кэш open_by_key + worksheets() по id таблицы.
+    Первое обращение загружает метаданные синхронно, устаревшие (старше ttl
+    или со сменившейся ревизией таблицы) отдаются как есть и обновляются в фоновом потоке.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._items: dict[str, SpreadsheetMeta] = {}
+        self._lock = threading.Lock()
+        self._key_locks: dict[str, threading.Lock] = {}
+        self._refreshing: set[str] = set()
+
+    def get(self, spreadsheet_id: str) -> SpreadsheetMeta:
+        spreadsheet_id = str(spreadsheet_id)
+        with self._lock:
+            meta = self._items.get(spreadsheet_id)
+
+        if meta is None:
+            with self._key_lock(spreadsheet_id):
+                with self._lock:
+                    meta = self._items.get(spreadsheet_id)
+                if meta is None:
+                    meta = self._load(spreadsheet_id)
+            return meta
+
+        revision = revision_tracker.current(spreadsheet_id)
+        stale = (revision != meta.revision) if revision is not None else (meta.age() > self.ttl)
+        if stale:
+            self.refresh_in_background(spreadsheet_id)
+        return meta
+
+    def worksheet(self, spreadsheet_id: str, title: str):
+        ws = self.get(spreadsheet_id).find(title)
+        if ws is None:
+            from gspread import WorksheetNotFound
+            raise WorksheetNotFound(title)
+        return ws
+
+    def worksheet_by_id(self, spreadsheet_id: str, sheet_id: int):
+        return self.get(spreadsheet_id).by_id.get(int(sheet_id))
+
+    def refresh_in_background(self, spreadsheet_id: str) -> None:
+        spreadsheet_id = str(spreadsheet_id)
+        with self._lock:
+            if spreadsheet_id in self._refreshing:
+                return
+            self._refreshing.add(spreadsheet_id)
+
+        def _run():
+            try:
+                self._load(spreadsheet_id)
+            except Exception as e:
+                print(f" Не удалось обновить листы таблицы {spreadsheet_id}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(spreadsheet_id)
+
+        threading.Thread(target=_run, name=f"meta-refresh-{spreadsheet_id}", daemon=True).start()
+
+    def invalidate(self, spreadsheet_id: str | None = None) -> None:
+        with self._lock:
+            if spreadsheet_id is None:
+                self._items.clear()
+            else:
+                self._items.pop(str(spreadsheet_id), None)
+
+    def _load(self, spreadsheet_id: str) -> SpreadsheetMeta:
+        client = get_google_client()
+        if not client:
+            raise RuntimeError("Google Sheets клиент не доступен")
+
+        # ревизию узнаём до загрузки: правка во время загрузки не потеряется
+        revision = revision_tracker.current(spreadsheet_id)
+        ss = client.open_by_key(spreadsheet_id)
+        meta = SpreadsheetMeta(spreadsheet=ss, worksheets=ss.worksheets(), revision=revision)
+        with self._lock:
+            self._items[spreadsheet_id] = meta
+        print(f" Метаданные таблицы '{ss.title}': {len(meta.worksheets)} листов")
+        return meta
+
+    def _key_lock(self, spreadsheet_id: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(spreadsheet_id, threading.Lock())
+
+
+metadata_registry = MetadataRegistry(ttl=config.sheets_meta_ttl)
@@ -0,0 +1,97 @@
+import threading
+import time
+
+from pligrim_bot.config.app_config import config
+
+
+class RevisionTracker:
+    """
+    Дешёвый маркер изменений таблицы: version и modifiedTime из Drive files.get.
+    Маркер спрашиваем не чаще раза в grace секунд на таблицу; пока он не сдвинулся,
+    снимки листов, индексы и разобранные пакеты используются без повторной загрузки.
+    Если Drive не ответил, маркер неизвестен (None) до следующей попытки через grace
+    секунд — кэши в это время живут по своим ttl, а не по старой ревизии.
+    """
+
+    def __init__(self, grace: float, enabled: bool = True):
+        self.grace = grace
+        self.enabled = enabled
+        self._items: dict[str, tuple[float, str | None]] = {}
+        # последний полученный маркер — только чтобы сообщать об изменениях
+        self._last: dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._key_locks: dict[str, threading.Lock] = {}
+        self.stats = {"checks": 0, "changes": 0, "errors": 0}
+
+    def current(self, spreadsheet_id: str) -> str | None:
+        """Маркер ревизии таблицы или None, если он неизвестен (трекер выключен, Drive недоступен)."""
+        if not self.enabled:
+            return None
+        spreadsheet_id = str(spreadsheet_id)
+
+        cached = self._recent(spreadsheet_id)
+        if cached is not None:
+            return cached[1]
+
+        # одна таблица — один запрос к Drive, даже если спрашивают несколько потоков
+        with self._key_lock(spreadsheet_id):
+            cached = self._recent(spreadsheet_id)
+            if cached is not None:
+                return cached[1]
+
+            revision = self._fetch(spreadsheet_id)
+            with self._lock:
+                previous = self._last.get(spreadsheet_id)
+                if revision is not None:
+                    self._last[spreadsheet_id] = revision
+                # неудачу тоже запоминаем на grace секунд, чтобы не долбить Drive
+                self._items[spreadsheet_id] = (time.monotonic(), revision)
+
+            if revision is not None and previous is not None and revision != previous:
+                self.stats["changes"] += 1
+                print(f" Таблица {spreadsheet_id} изменилась: ревизия {previous} → {revision}")
+            return revision
+
+    def forget(self, spreadsheet_id: str | None = None) -> None:
+        """Следующий current() спросит Drive заново (например, после правки из самого бота)."""
+        with self._lock:
+            if spreadsheet_id is None:
+                self._items.clear()
+            else:
+                self._items.pop(str(spreadsheet_id), None)
+
+    def _recent(self, spreadsheet_id: str) -> tuple[float, str | None] | None:
+        with self._lock:
+            item = self._items.get(spreadsheet_id)
+        if item is not None and time.monotonic() - item[0] <= self.grace:
+            return item
+        return None
+
+    def _fetch(self, spreadsheet_id: str) -> str | None:
+        from gspread.urls import DRIVE_FILES_API_V3_URL
+
+        from pligrim_bot.config.settings import get_google_client
+
+        client = get_google_client()
+        if not client:
+            return None
+        self.stats["checks"] += 1
+        try:
+            res = client.http_client.request(
+                "get",
+                f"{DRIVE_FILES_API_V3_URL}/{spreadsheet_id}",
+                params={"fields": "version,modifiedTime", "supportsAllDrives": True},
+            )
+            meta = res.json()
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f" Не удалось узнать ревизию таблицы {spreadsheet_id}: {e}")
+            return None
+        return f"{meta.get('version')}:{meta.get('modifiedTime')}"
+
+    def _key_lock(self, spreadsheet_id: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(spreadsheet_id, threading.Lock())
+
+
+revision_tracker = RevisionTracker(grace=config.sheets_revision_grace, enabled=config.sheets_track_revisions)
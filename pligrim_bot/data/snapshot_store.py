@@ -0,0 +1,78 @@
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+
+# Снимки, которые не обновлялись дольше, при загрузке удаляем
+MAX_AGE_SECONDS = 14 * 24 * 3600
+
+
+class SnapshotStore:
+    """
+    Снимки листов на диске (SQLite в tmp/), чтобы перезапуск бота не выбрасывал
+    всё скачанное из Google Sheets. Ключ — (id таблицы, id листа) + ревизия таблицы:
+    после старта снимок используется, только если ревизия в Drive та же.
+    Значения хранятся как JSON, сжатый zlib.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS snapshots (
+                spreadsheet_id TEXT NOT NULL,
+                sheet_id INTEGER NOT NULL,
+                revision TEXT NOT NULL,
+                title TEXT NOT NULL,
+                saved_at REAL NOT NULL,
+                data BLOB NOT NULL,
+                PRIMARY KEY (spreadsheet_id, sheet_id)
+            )
+            """
+        )
+        self._db.commit()
+
+    def save(self, spreadsheet_id: str, sheet_id: int, revision: str, title: str, values: list[list[str]]) -> None:
+        data = zlib.compress(json.dumps(values, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), 1)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?, ?)",
+                (str(spreadsheet_id), int(sheet_id), revision, title, time.time(), data),
+            )
+            self._db.commit()
+
+    def load_all(self) -> list[tuple[str, int, str, str, list[list[str]]]]:
+        """Все сохранённые снимки: (spreadsheet_id, sheet_id, revision, title, values). Старые удаляются."""
+        with self._lock:
+            self._db.execute("DELETE FROM snapshots WHERE saved_at < ?", (time.time() - MAX_AGE_SECONDS,))
+            self._db.commit()
+            rows = self._db.execute(
+                "SELECT spreadsheet_id, sheet_id, revision, title, data FROM snapshots"
+            ).fetchall()
+
+        out = []
+        for spreadsheet_id, sheet_id, revision, title, data in rows:
+            try:
+                values = json.loads(zlib.decompress(data).decode("utf-8"))
+            except Exception as e:
+                print(f" Снимок листа '{title}' на диске повреждён, пропускаем: {e}")
+                continue
+            out.append((spreadsheet_id, sheet_id, revision, title, values))
+        return out
+
+    def forget(self, spreadsheet_id: str | None = None) -> None:
+        with self._lock:
+            if spreadsheet_id is None:
+                self._db.execute("DELETE FROM snapshots")
+            else:
+                self._db.execute("DELETE FROM snapshots WHERE spreadsheet_id = ?", (str(spreadsheet_id),))
+            self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,311 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Hashable
+
+from pligrim_bot.config.app_config import config
+from pligrim_bot.data.revisions import RevisionTracker, revision_tracker
+from pligrim_bot.data.snapshot_store import SnapshotStore
+
+
+def sheet_key(ws) -> tuple[str, int]:
+    """Ключ листа: (id таблицы, id листа). Не зависит от названия листа."""
+    spreadsheet_id = getattr(ws, "spreadsheet_id", None) or ws.spreadsheet.id
+    return str(spreadsheet_id), int(ws.id)
+
+
+@dataclass
+class SheetSnapshot:
+    """
+    Снимок одного листа: результат get_all_values() + производные данные.
+    values общий для всех парсеров — изменять его нельзя.
+    """
+    spreadsheet_id: str
+    sheet_id: int
+    title: str
+    values: list[list[str]]
+    revision: str | None = None
+    fetched_at: float = field(default_factory=time.monotonic)
+    # поднят с диска после перезапуска: свежим его делает только совпавшая ревизия
+    restored: bool = False
+    _memo: dict = field(default_factory=dict, repr=False)
+    _memo_locks: dict = field(default_factory=dict, repr=False)
+    _memo_lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def age(self) -> float:
+        return time.monotonic() - self.fetched_at
+
+    def memo(self, name: Hashable, build: Callable[[], Any]) -> Any:
+        """
+        Производные данные (индексы, распарсенные пакеты) живут ровно
+        столько же, сколько сам снимок: новый снимок — новый memo.
+        Замок у каждого имени свой: пока строится одно, другое не ждёт.
+        """
+        with self._memo_lock:
+            lock = self._memo_locks.setdefault(name, threading.RLock())
+        with lock:
+            if name not in self._memo:
+                self._memo[name] = build()
+            return self._memo[name]
+
+    def cached(self, name: Hashable) -> Any:
+        """Готовые производные данные или None — ничего не строит и не ждёт."""
+        return self._memo.get(name)
+
+
+class SnapshotCache:
+    """
+    Кэш снимков листов с ключом (spreadsheet_id, sheet_id).
+    Лист скачивается не чаще одного раза за ttl; снимок также устаревает,
+    если для таблицы выставлена новая ревизия (set_revision).
+    С трекером ревизий (data/revisions.py) ttl не нужен: снимок живёт,
+    пока не сдвинулась ревизия таблицы в Drive, но не дольше max_age.
+    В памяти не больше max_entries снимков — давно не нужные вытесняются (LRU)
+    вместе со своими memo и блокировками.
+    Если подключено хранилище (store, его открывает main), снимки с известной
+    ревизией дублируются на диск (data/snapshot_store.py) и поднимаются
+    после перезапуска через restore().
+    """
+
+    def __init__(self, ttl: float, max_entries: int, max_age: float,
+                 revisions: RevisionTracker | None = None, store: SnapshotStore | None = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.revisions = revisions
+        self.store = store
+        self._items: OrderedDict[tuple[str, int], SheetSnapshot] = OrderedDict()
+        self._revisions: dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._key_locks: dict[tuple[str, int], threading.Lock] = {}
+        self.stats = {"hits": 0, "fetches": 0, "evicted": 0, "batch_calls": 0, "batch_ranges": 0}
+
+    def get(self, ws) -> SheetSnapshot:
+        key = sheet_key(ws)
+        snap = self._fresh(key)
+        if snap is not None:
+            self.stats["hits"] += 1
+            return snap
+
+        # один лист — одна загрузка, даже если его одновременно просят несколько потоков
+        with self._key_lock(key):
+            snap = self._fresh(key)
+            if snap is not None:
+                self.stats["hits"] += 1
+                return snap
+
+            values = ws.get_all_values()
+            self.stats["fetches"] += 1
+            print(f" Загружен лист '{ws.title}': {len(values)} строк")
+            return self.put(ws, values)
+
+    def put(self, ws, values: list[list[str]]) -> SheetSnapshot:
+        """Кладёт в кэш значения листа, загруженные в обход get() (например, batchGet)."""
+        key = sheet_key(ws)
+        with self._lock:
+            snap = SheetSnapshot(
+                spreadsheet_id=key[0],
+                sheet_id=key[1],
+                title=ws.title,
+                values=values,
+                revision=self._revisions.get(key[0]),
+            )
+            self._items[key] = snap
+            self._items.move_to_end(key)
+            self._evict_locked()
+
+        if self.store is not None and snap.revision is not None:
+            try:
+                self.store.save(key[0], key[1], snap.revision, snap.title, values)
+            except Exception as e:
+                print(f" Не удалось сохранить снимок листа '{snap.title}' на диск: {e}")
+        return snap
+
+    def restore(self) -> int:
+        """
+        Поднимает снимки, сохранённые до перезапуска. Такой снимок считается
+        свежим, только когда ревизия таблицы в Drive совпадёт с сохранённой;
+        без трекера ревизий он сразу устаревший (ttl проверить нечем).
+        """
+        if self.store is None:
+            return 0
+        try:
+            saved = self.store.load_all()
+        except Exception as e:
+            print(f" Не удалось прочитать снимки с диска: {e}")
+            return 0
+
+        restored = 0
+        for spreadsheet_id, sheet_id, revision, title, values in saved:
+            key = (spreadsheet_id, sheet_id)
+            snap = SheetSnapshot(
+                spreadsheet_id=spreadsheet_id,
+                sheet_id=sheet_id,
+                title=title,
+                values=values,
+                revision=revision,
+                restored=True,
+            )
+            with self._lock:
+                if len(self._items) >= self.max_entries:
+                    break
+                # пока читали диск, лист могли уже скачать заново
+                if key in self._items:
+                    continue
+                # поднятые с диска — самые старые: вытесняются первыми
+                self._items[key] = snap
+                self._items.move_to_end(key, last=False)
+            restored += 1
+        print(f" Снимки листов с диска: {restored}")
+        return restored
+
+    def peek(self, ws) -> SheetSnapshot | None:
+        """Свежий снимок листа, если он уже есть; без загрузки."""
+        return self._fresh(sheet_key(ws))
+
+    def set_revision(self, spreadsheet_id: str, revision: str | None) -> None:
+        """Запоминает маркер ревизии таблицы. Снимки со старой ревизией устаревают."""
+        with self._lock:
+            if revision is None:
+                self._revisions.pop(str(spreadsheet_id), None)
+            else:
+                self._revisions[str(spreadsheet_id)] = revision
+
+    def invalidate(self, spreadsheet_id: str | None = None, sheet_id: int | None = None) -> None:
+        """Сбрасывает снимки: все, одной таблицы или одного листа."""
+        with self._lock:
+            if spreadsheet_id is None:
+                self._items.clear()
+            else:
+                for key in list(self._items):
+                    if key[0] == str(spreadsheet_id) and (sheet_id is None or key[1] == int(sheet_id)):
+                        del self._items[key]
+            self._prune_key_locks()
+
+    def _fresh(self, key: tuple[str, int]) -> SheetSnapshot | None:
+        tracked = self.revisions.current(key[0]) if self.revisions is not None else None
+        if tracked is not None:
+            self.set_revision(key[0], tracked)
+
+        with self._lock:
+            snap = self._items.get(key)
+            revision = self._revisions.get(key[0])
+        if snap is None:
+            return None
+        if snap.revision != revision:
+            return None
+        if tracked is None and (snap.restored or snap.age() > self.ttl):
+            return None
+        if snap.age() > self.max_age:
+            return None
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+        return snap
+
+    def _evict_locked(self) -> None:
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+            self.stats["evicted"] += 1
+        if len(self._key_locks) > 2 * self.max_entries:
+            self._prune_key_locks()
+
+    def _prune_key_locks(self) -> None:
+        # блокировки листов, которых нет в кэше и которые сейчас никто не держит
+        for key in [k for k, lock in self._key_locks.items() if k not in self._items and not lock.locked()]:
+            del self._key_locks[key]
+
+    def _key_lock(self, key: tuple[str, int]) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+
+snapshot_cache = SnapshotCache(
+    ttl=config.sheets_cache_ttl,
+    max_entries=config.sheets_cache_max,
+    max_age=config.sheets_cache_max_age,
+    revisions=revision_tracker,
+)
+
+
+def get_snapshot(ws) -> SheetSnapshot:
+    return snapshot_cache.get(ws)
+
+
+def sheet_values(ws) -> list[list[str]]:
+    """Замена ws.get_all_values() для парсеров: берёт значения из общего снимка."""
+    return snapshot_cache.get(ws).values
+
+
+def a1_range(ws, a1: str | None = None) -> str:
+    """Диапазон для values API: 'Лист'!A1:F12, или весь лист, если a1 не задан."""
+    title = "'" + ws.title.replace("'", "''") + "'"
+    return f"{title}!{a1}" if a1 else title
+
+
+def _slice(values: list[list[str]], a1: str) -> list[list[str]]:
+    from gspread.utils import a1_range_to_grid_range
+
+    g = a1_range_to_grid_range(a1)
+    c0, c1 = g.get("startColumnIndex", 0), g.get("endColumnIndex")
+    return [row[c0:c1] for row in values[g.get("startRowIndex", 0):g.get("endRowIndex")]]
+
+
+def batch_values(ss, requests: list[tuple[Any, str | None]]) -> list[list[list[str]]]:
+    """
+    Несколько диапазонов одним запросом spreadsheets.values.batchGet.
+    requests: [(лист, A1-диапазон без имени листа)]; None вместо A1 — весь лист.
+    Что уже есть в свежих снимках, берётся из кэша; целые листы из ответа
+    сохраняются как снимки — следующий sheet_values() их не скачает.
+    """
+    out: list = [None] * len(requests)
+    missing = []
+    for i, (ws, a1) in enumerate(requests):
+        snap = snapshot_cache.peek(ws)
+        if snap is None:
+            missing.append(i)
+        else:
+            snapshot_cache.stats["hits"] += 1
+            out[i] = snap.values if a1 is None else _slice(snap.values, a1)
+
+    if missing:
+        from gspread.utils import fill_gaps
+
+        resp = ss.values_batch_get([a1_range(*requests[i]) for i in missing])
+        snapshot_cache.stats["batch_calls"] += 1
+        snapshot_cache.stats["batch_ranges"] += len(missing)
+        print(f" batchGet: {len(missing)} диапазонов одним запросом")
+
+        for i, vr in zip(missing, resp.get("valueRanges", [])):
+            ws, a1 = requests[i]
+            values = fill_gaps(vr.get("values", []))
+            if a1 is None:
+                values = snapshot_cache.put(ws, values).values
+            out[i] = values
+    return out
+
+
+def head_range(rows: int, cols: int | None = None) -> str:
+    """A1 первых rows строк и cols колонок: 'A1:F12'; без cols — все колонки ('1:12')."""
+    from gspread.utils import rowcol_to_a1
+
+    return f"A1:{rowcol_to_a1(rows, cols)}" if cols else f"1:{rows}"
+
+
+def sheet_heads(ss, worksheets: list, rows: int, cols: int | None = None) -> list[list[list[str]]]:
+    """
+    Шапки нескольких листов (первые rows × cols) одним batchGet.
+    Для поиска по заголовкам — весь лист ради первых строк не скачиваем.
+    """
+    return batch_values(ss, [(ws, head_range(rows, cols)) for ws in worksheets])
+
+
+def sheet_head(ws, rows: int, cols: int | None = None) -> list[list[str]]:
+    """Первые rows строк (и cols колонок) одного листа."""
+    return sheet_heads(ws.spreadsheet, [ws], rows, cols)[0]
+
+
+def load_snapshots(ss, worksheets: list) -> None:
+    """Снимки сразу нескольких листов одной таблицы — одним batchGet вместо N загрузок."""
+    batch_values(ss, [(ws, None) for ws in worksheets])
@@ -1,18 +1,44 @@
 
 from aiogram import types
-from aiogram.filters import Command
-from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, CallbackQuery
+from aiogram.filters import Command, ExceptionTypeFilter
+from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, CallbackQuery, ErrorEvent
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-from gspread import spreadsheet
-from pligrim_bot.config.settings import PALM_SHEETS
+from pligrim_bot.config.settings import palm_sheets, sheets_ready
 
+from pligrim_bot.core.google_sheets import get_flight_sheet_titles, get_flight_worksheet
 from pligrim_bot.core.parsers.package_parser import *
+from pligrim_bot.core.sheets_gateway import SheetsTimeout, sheets_call
+from pligrim_bot.core.telegram_queue import outbound
 from pligrim_bot.core.utils.text_utils import clean
-from pligrim_bot.core.voucher.builder import assemble_voucher, assemble_voucher_from_one_row_style, build_maps_smart
-from pligrim_bot.core.voucher.render import generate_ticket, generate_pdf_from_png
+from pligrim_bot.core.voucher.flight_index import flight_schedule
+from pligrim_bot.data.cache import session_store
+from pligrim_bot.data.snapshots import load_snapshots, sheet_head, sheet_values
 
-# Кэш для хранения полных списков листов
-USER_SHEETS_CACHE = {}
+# Полные списки листов по пользователям (для пагинации); с TTL и LRU, см. data/cache.py
+USER_SHEETS_CACHE = session_store("user_sheets")
+
+SHEETS_TIMEOUT_TEXT = "⏳ Google Sheets не отвечает, попробуйте ещё раз."
+FLIGHT_SHEETS_MISSING_TEXT = "️ Таблица рейсов не подключена (FLIGHT_SPREADSHEET_ID)."
+
+
+async def answer_sheets_timeout(callback: CallbackQuery):
+    """Сообщает, что Google Sheets не ответил за SHEETS_TIMEOUT, и убирает «часики» с кнопки."""
+    try:
+        await callback.answer(SHEETS_TIMEOUT_TEXT, show_alert=True)
+    except Exception:
+        # на запрос уже ответили или он устарел — пишем сообщением
+        await callback.message.answer(SHEETS_TIMEOUT_TEXT)
+
+
+@dp.errors(ExceptionTypeFilter(SheetsTimeout))
+async def sheets_timeout_error(event: ErrorEvent):
+    """SheetsTimeout, не пойманный в самом обработчике (например, в сценарии рейсов)."""
+    update = event.update
+    if update.callback_query:
+        await answer_sheets_timeout(update.callback_query)
+    elif update.message:
+        await update.message.answer(SHEETS_TIMEOUT_TEXT)
+    return True
 
 def get_month_sheets_buttons(sheet_titles, show_all=False):
     """Клавиатура для выбора листа с пагинацией"""
@@ -125,8 +151,12 @@ def get_month_buttons():
     return keyboard
 
 def get_palm_month_buttons() -> InlineKeyboardMarkup:
-    """Кнопки выбора месяца (по PALM_SHEETS)."""
-    rows = [[InlineKeyboardButton(text=mk, callback_data=f"palm_month:{mk}")] for mk in PALM_SHEETS.keys()]
+    """Кнопки выбора месяца (по palm_sheets())."""
+    if not sheets_ready():
+        # keyboards сам импортирует этот модуль — берём клавиатуру при вызове
+        from pligrim_bot.config.keyboards import warming_up_kb
+        return warming_up_kb()
+    rows = [[InlineKeyboardButton(text=mk, callback_data=f"palm_month:{mk}")] for mk in palm_sheets().keys()]
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
@@ -144,7 +174,7 @@ async def choose_scenario(callback: CallbackQuery):
     elif scenario == "flight":
         await callback.message.answer(
             "️ Вы выбрали Flight Vaucher.\n\nВыберите месяц (показаны текущий и ближайшие 3):",
-            reply_markup=get_month_buttons()
+            reply_markup=await sheets_call(get_month_buttons)
         )
     await callback.answer()
 
@@ -153,8 +183,12 @@ async def choose_scenario(callback: CallbackQuery):
 async def sheet_selected(callback: CallbackQuery):
     sheet_name = callback.data.split(":", 1)[1]
 
-    ws = spreadsheet.worksheet(sheet_name)
-    packages = find_existing_packages(ws)
+    ws = await sheets_call(get_flight_worksheet, sheet_name)
+    if ws is None:
+        await callback.message.answer(FLIGHT_SHEETS_MISSING_TEXT)
+        await callback.answer()
+        return
+    packages = await sheets_call(find_existing_packages, ws)
 
     if not packages:
         await callback.message.answer(f" В листе '{sheet_name}' не найдено пакетов.")
@@ -191,26 +225,34 @@ async def show_all_sheets_handler(callback: CallbackQuery):
 async def back_to_months(callback: CallbackQuery):
     await callback.message.edit_text(
         "️ Выберите месяц (показаны текущий и ближайшие 3):",
-        reply_markup=get_month_buttons()
+        reply_markup=await sheets_call(get_month_buttons)
     )
     await callback.answer()
 
 @dp.callback_query(F.data.startswith("package:"))
 async def package_selected(callback: CallbackQuery):
     _, sheet_name, package_name = callback.data.split(":", 2)
-    ws = spreadsheet.worksheet(sheet_name)
+    ws = await sheets_call(get_flight_worksheet, sheet_name)
+    if ws is None:
+        await callback.message.answer(FLIGHT_SHEETS_MISSING_TEXT)
+        await callback.answer()
+        return
+
+    ws_sched = await sheets_call(get_flight_worksheet, "расписание рейсов")
+    # лист пакета и расписание — одним batchGet, дальше оба читаются из снимков
+    await sheets_call(load_snapshots, ws.spreadsheet, [ws, ws_sched])
 
-    flights = find_flight_dates(ws, package_name)
+    flights = await sheets_call(find_flight_dates, ws, package_name)
     if not flights:
         await callback.message.answer(f"️ Даты для пакета '{package_name}' не найдены.")
         await callback.answer()
         return
 
-    ws_sched = spreadsheet.worksheet("расписание рейсов")
-    OUT_AJ, OUT_AM, RET_JA, RET_MA = build_maps_smart(ws_sched)
+    schedule = await sheets_call(flight_schedule, ws_sched)
+    OUT_AJ, OUT_AM, RET_JA, RET_MA = schedule.maps
 
     kb = InlineKeyboardBuilder()
-    data_pkg = ws.get_all_values()
+    data_pkg = await sheets_call(sheet_values, ws)
 
     for f in flights:
         # 1) пробуем достать явный заголовок маршрута около строк пакета
@@ -261,6 +303,8 @@ def token_to_dir(token: str) -> str:
 
 @dp.callback_query(F.data.startswith("d|"))
 async def flight_date_selected(callback: CallbackQuery):
+    # рендер грузим в самом хендлере — для старта бота он не нужен
+    from pligrim_bot.core.voucher.render import generate_ticket, generate_pdf_from_png
     parts = callback.data.split("|")
     if len(parts) < 4:
         await callback.message.answer("️ Некорректные данные кнопки.")
@@ -273,13 +317,14 @@ async def flight_date_selected(callback: CallbackQuery):
     match = re.search(r"Пакет:\s*([A-ZА-Яa-zа-я0-9\s]+)", prev_text)
     package_name = match.group(1).strip().replace(" ", "_") if match else "VOUCHER"
 
-    ws = spreadsheet.worksheet("расписание рейсов")
+    ws = await sheets_call(get_flight_worksheet, "расписание рейсов")
+    if ws is None:
+        await callback.message.answer(FLIGHT_SHEETS_MISSING_TEXT)
+        return
 
     # 1️⃣ Собираем данные рейса
-    data = assemble_voucher_from_one_row_style(ws, dep, ret, token)
-    if not data:
-        OUT_AJ, OUT_AM, RET_JA, RET_MA = build_maps_smart(ws)
-        data = assemble_voucher(OUT_AJ, OUT_AM, RET_JA, RET_MA, dep, ret, token)
+    schedule = await sheets_call(flight_schedule, ws)
+    data = schedule.voucher(dep, ret, token)
 
     if not data:
         await callback.message.answer("️ В расписании нет данных для этого направления.")
@@ -308,7 +353,8 @@ async def flight_date_selected(callback: CallbackQuery):
     os.rename(pdf_path, pretty_pdf)
 
     # 5️⃣ Отправляем PDF пользователю
-    await callback.message.answer_document(
+    await outbound.answer_document(
+        callback.message,
         types.FSInputFile(pretty_pdf),
         caption=f" Ваш ваучер: {package_name.replace('_', ' ')}"
     )
@@ -320,7 +366,7 @@ async def flight_date_selected(callback: CallbackQuery):
 # --- Показ всех месяцев ---
 @dp.callback_query(F.data == "show_all")
 async def show_all_sheets(callback: CallbackQuery):
-    sheets = get_available_sheets()
+    sheets = await sheets_call(get_available_sheets)
     keyboard = InlineKeyboardMarkup(
         inline_keyboard=[
             [InlineKeyboardButton(text=name, callback_data=f"sheet:{name}")]
@@ -332,16 +378,16 @@ async def show_all_sheets(callback: CallbackQuery):
 
 def get_available_sheets():
     """Возвращает все актуальные месяцы без исключённых листов"""
-    all_sheets = [ws.title for ws in spreadsheet.worksheets()]
+    all_sheets = get_flight_sheet_titles()
     return [s for s in all_sheets if s not in EXCLUDE_SHEETS and "(копия" not in s.lower()]
 
 def find_existing_packages(ws):
     """Находит все пакеты в первых строках (горизонтально расположенные)"""
-    values = ws.get_all_values()
-    # Берём первые 10 строк, проверяем каждую ячейку
+    # Берём только первые 10 строк, проверяем каждую ячейку
+    values = sheet_head(ws, rows=10)
     found = set()
 
-    for row in values[:10]:
+    for row in values:
         for cell in row:
             text = clean(cell)
             for pkg in PACKAGE_NAMES:
@@ -1,31 +1,29 @@
-import os
 import re
-from typing import List, Dict
+from typing import List
 
 from aiogram import types, F
 from aiogram.types import (
     InlineKeyboardMarkup,
     InlineKeyboardButton,
     CallbackQuery,
-    FSInputFile
+    BufferedInputFile,
 )
 from aiogram.fsm.state import StatesGroup, State
 from aiogram.fsm.context import FSMContext
 
-from pligrim_bot.config.constants import TMP_DIR, dp
+from pligrim_bot.config.constants import dp
 from pligrim_bot.config.keyboards import slot_for_city, citykey_for_value
 from pligrim_bot.core.parsers.people_parser import human_room
+from pligrim_bot.core.telegram_queue import outbound
 from pligrim_bot.core.utils.validation import city_ru
 from pligrim_bot.core.voucher.builder import base_payload_from, ensure_chronological_city_order, nights_from_dates
-from pligrim_bot.core.voucher.render import (
-    render_voucher_page1_png,
-    build_voucher_pdf,
-    build_filename_from_payload,
-    plural_nights,
-)
+from pligrim_bot.core.voucher.pool import render_voucher_pdf
+from pligrim_bot.core.utils.text_utils import plural_nights
+from pligrim_bot.core.voucher.render import build_filename_from_payload
+from pligrim_bot.data.cache import session_store
 
-# Глобальный кэш сессий редактирования: ключ — chat_id
-EDIT_SESSIONS: Dict[int, Dict] = {}
+# Сессии редактирования: ключ — chat_id; неиспользуемые вытесняются (см. data/cache.py)
+EDIT_SESSIONS = session_store("edit_sessions")
 
 class EditVoucherState(StatesGroup):
     waiting_value = State()
@@ -87,17 +85,9 @@ def edit_voucher_fields_kb(chat_id: int, group_idx: int) -> InlineKeyboardMarkup
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
-async def send_one_voucher_for_group(
-        message: types.Message,
-        pkg_title: str,
-        voucher: dict,
-        base: dict,
-        group: dict,
-        idx: int,
-        bg_index: int = -1
-):
+def group_payload(base: dict, group: dict) -> dict:
     """
-    Генерирует и отправляет ОДИН ваучер для конкретной комнаты/группы.
+    payload ваучера одной комнаты/группы: base + имена паломников и тип номера.
     """
     data = dict(base)
 
@@ -109,26 +99,12 @@ async def send_one_voucher_for_group(
     if human_ru:
         data["room1"] = human_ru
         data["room2"] = human_ru
+    return data
 
-    # 1. Рендерим PNG
-    p1_path = render_voucher_page1_png(data)
-
-    # 2. Формируем имя файла
-    raw_name = build_filename_from_payload(data)
-    # Добавляем idx, чтобы файлы не перезатирались, если имена одинаковые
-    pdf_name = f"{idx}_{raw_name}.pdf"
-    pdf_path = os.path.join(TMP_DIR, pdf_name)
-
-    # 3. Собираем PDF с выбранным фоном
-    build_voucher_pdf(
-        page1_png=p1_path,
-        city1=data.get("city1"),
-        transfer_raw=data.get("transfer"),
-        out_pdf_path=pdf_path,
-        bg_index=bg_index
-    )
 
-    # --- ФОРМИРУЕМ КРАСИВУЮ ПОДПИСЬ (CAPTION) ---
+def group_caption(pkg_title: str, group: dict) -> str:
+    names: List[str] = group.get("people") or []
+    kind = (group.get("kind") or "").upper()
 
     # Переводим тип комнаты на русский для красоты
     room_label = kind # Если не найдем, оставим как есть (QUAD)
@@ -141,18 +117,39 @@ async def send_one_voucher_for_group(
     pax_count = len(names)
     names_str = ", ".join(names)
 
-    # Собираем текст
-    caption = (
+    return (
         f"📄 {pkg_title}\n"
         f"🛏 {room_label} · {pax_count} pax\n"
         f"👥 {names_str}"
     )
 
-    # 4. Отправляем документ
-    doc = FSInputFile(pdf_path)
-    # Важно: parse_mode="HTML" не обязателен, если нет жирного шрифта,
-    # но caption будет выглядеть аккуратно благодаря переносам строк.
-    await message.answer_document(doc, caption=caption)
+
+async def render_group_pdf(base: dict, group: dict, idx: int, bg_index: int = -1) -> BufferedInputFile:
+    """
+    Рендерит ваучер группы в пуле процессов. Возвращает готовый к отправке документ.
+    """
+    data = group_payload(base, group)
+    pdf_bytes = await render_voucher_pdf(data, bg_index)
+
+    # Добавляем idx, чтобы файлы не перезатирались, если имена одинаковые
+    raw_name = build_filename_from_payload(data)
+    return BufferedInputFile(pdf_bytes, filename=f"{idx}_{raw_name}.pdf")
+
+
+async def send_one_voucher_for_group(
+        message: types.Message,
+        pkg_title: str,
+        voucher: dict,
+        base: dict,
+        group: dict,
+        idx: int,
+        bg_index: int = -1
+):
+    """
+    Генерирует и отправляет ОДИН ваучер для конкретной комнаты/группы.
+    """
+    doc = await render_group_pdf(base, group, idx, bg_index=bg_index)
+    await outbound.answer_document(message, doc, caption=group_caption(pkg_title, group))
 
 
 async def start_after_voucher_menu(
@@ -219,6 +216,7 @@ async def edit_grp_clicked(callback: CallbackQuery):
 
     # Сохраняем в сессию, какую группу редактируем
     sess["editing_group_idx"] = group_idx
+    EDIT_SESSIONS[callback.message.chat.id] = sess
 
     groups = sess["groups"]
     if group_idx < 1 or group_idx > len(groups):
@@ -348,8 +346,9 @@ async def process_edit_value(message: types.Message, state: FSMContext):
         voucher[f"stay{slot_key}"] = plural_nights(nights_count)
         ensure_chronological_city_order(voucher)
 
-    # Обновляем сессию
-    EDIT_SESSIONS[chat_id]["voucher"] = voucher
+    # Обновляем сессию (присваиваем заново, чтобы пересчитать её объём)
+    sess["voucher"] = voucher
+    EDIT_SESSIONS[chat_id] = sess
 
     await message.answer(
         "✅ Значение обновлено! Можно изменить еще поля или отправить обновленный ваучер.",
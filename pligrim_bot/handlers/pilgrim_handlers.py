@@ -5,29 +5,41 @@ import traceback
 import re
 
 from aiogram import types, F
-from aiogram.types import CallbackQuery, InputMediaPhoto, FSInputFile
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import CallbackQuery, InputMediaPhoto, FSInputFile, BufferedInputFile
 
 # --- Импорты глобальных объектов ---
+from pligrim_bot.config.app_config import config
 from pligrim_bot.config.constants import dp, PREVIEW_CACHE
+from pligrim_bot.config.settings import palm_sheets, sheets_ready
 
 # --- Импорты клавиатур и настроек ---
 from pligrim_bot.config.keyboards import (
     get_palm_sheet_buttons, preview_main_kb, build_palm_packages_kb,
-    get_palm_month_buttons, choose_background_kb
+    get_palm_month_buttons, choose_background_kb, PALM_SHEETS_PAGE, NO_PALM_SHEETS
 )
-from pligrim_bot.config.settings import client, PALM_SHEETS
-
 # --- ИСПРАВЛЕННЫЕ ИМПОРТЫ ---
-from pligrim_bot.core.google_sheets import find_worksheet_by_title
+# Google Sheets дергаем только через пул потоков, чтобы не блокировать polling
+from pligrim_bot.core.sheets_gateway import SheetsTimeout, aget_palm_worksheet, sheets_call
+# Документы и альбомы отправляем через общую очередь с лимитами Telegram
+from pligrim_bot.core.telegram_queue import outbound
+# Листы, которые откроют следующими, грузим заранее
+from pligrim_bot.core.prefetch import prefetcher
 # find_palm_packages берем отсюда:
-from pligrim_bot.core.parsers.package_parser import collect_voucher_by_package, find_palm_packages
+from pligrim_bot.core.parsers.package_parser import find_palm_packages, parsed_packages_if_ready, voucher_for_package
 
 from pligrim_bot.core.voucher.builder import ensure_chronological_city_order, base_payload_from
+from pligrim_bot.data.file_ids import file_id_cache
+from pligrim_bot.core.voucher.batch import merged_pdf, render_all, zip_archive
+from pligrim_bot.core.voucher.pdf import build_pdf
 from pligrim_bot.core.voucher.render import (
-    AVAILABLE_BACKGROUNDS, pick_page2_bg
+    AVAILABLE_BACKGROUNDS, pick_page2_bg, build_filename_from_payload, slugify_filename_part
+)
+from pligrim_bot.handlers.flight_handlers import USER_SHEETS_CACHE, answer_sheets_timeout
+from pligrim_bot.handlers.palm_edit_handlers import (
+    send_one_voucher_for_group, start_after_voucher_menu, render_group_pdf, group_caption, group_payload,
+    EDIT_SESSIONS
 )
-from pligrim_bot.handlers.flight_handlers import USER_SHEETS_CACHE
-from pligrim_bot.handlers.palm_edit_handlers import send_one_voucher_for_group, start_after_voucher_menu, EDIT_SESSIONS
 
 
 # =========================================================================
@@ -47,19 +59,13 @@ async def on_preview_send_ask_bg(call: CallbackQuery):
     try:
         cache_id = call.data.split(":")[1]
 
-        media_group = []
-        for i, path in enumerate(AVAILABLE_BACKGROUNDS):
-            if os.path.exists(path):
-                # Подпись только под первой картинкой
-                caption = " Выберите вариант дизайна (1, 2 или 3)" if i == 0 else None
-                media_group.append(InputMediaPhoto(media=FSInputFile(path), caption=caption))
-
-        if not media_group:
+        paths = [path for path in AVAILABLE_BACKGROUNDS if os.path.exists(path)]
+        if not paths:
             await call.answer(" Ошибка: файлы фонов не найдены", show_alert=True)
             return
 
-        # Отправляем альбом
-        await call.message.answer_media_group(media=media_group)
+        # Отправляем альбом (после первой загрузки — по file_id)
+        await send_background_previews(call.message, paths)
 
         # Отправляем кнопки
         await call.message.answer(
@@ -71,6 +77,30 @@ async def on_preview_send_ask_bg(call: CallbackQuery):
         await call.message.answer("Произошла ошибка при отправке превью")
 
 
+async def send_background_previews(message: types.Message, paths: list[str]):
+    def album(cached: bool) -> list[InputMediaPhoto]:
+        media = []
+        for i, path in enumerate(paths):
+            # Подпись только под первой картинкой
+            caption = " Выберите вариант дизайна (1, 2 или 3)" if i == 0 else None
+            src = file_id_cache.input_file(path) if cached else FSInputFile(path)
+            media.append(InputMediaPhoto(media=src, caption=caption))
+        return media
+
+    try:
+        sent = await outbound.answer_media_group(message, album(cached=True))
+    except TelegramBadRequest as e:
+        # file_id мог стать недействительным — забываем и загружаем файлы заново
+        print(f" file_id фонов не подошли ({e}), загружаем файлы заново")
+        for path in paths:
+            file_id_cache.forget(path)
+        sent = await outbound.answer_media_group(message, album(cached=False))
+
+    for path, msg in zip(paths, sent):
+        if msg.photo and file_id_cache.get(path) != msg.photo[-1].file_id:
+            file_id_cache.put(path, msg.photo[-1].file_id)
+
+
 @dp.callback_query(F.data.startswith("sel_bg:"))
 async def on_background_selected(call: CallbackQuery):
     """
@@ -116,8 +146,29 @@ async def on_background_selected(call: CallbackQuery):
 # 2. НАВИГАЦИЯ (ВЫБОР МЕСЯЦА, ЛИСТА, ПАКЕТА)
 # =========================================================================
 
+SHEETS_WARMING_TEXT = "⏳ Бот ещё загружает список таблиц, попробуйте через минуту"
+
+
+async def answer_if_month_unavailable(callback: CallbackQuery, month_key: str) -> bool:
+    """
+    Кнопка могла остаться в старом сообщении: после перезапуска список таблиц
+    ещё грузится, или месяца в нём уже нет. Тогда отвечаем на нажатие и возвращаем True.
+    """
+    if not sheets_ready():
+        await callback.answer(SHEETS_WARMING_TEXT, show_alert=True)
+        return True
+    if month_key not in palm_sheets():
+        await callback.answer("Этого месяца больше нет в списке таблиц, выберите месяц заново", show_alert=True)
+        await callback.message.answer("🕋 Выберите месяц для паломников:", reply_markup=get_palm_month_buttons())
+        return True
+    return False
+
+
 @dp.callback_query(F.data == "get_month_buttons")
 async def show_month_buttons(callback: CallbackQuery):
+    if not sheets_ready():
+        await callback.answer(SHEETS_WARMING_TEXT)
+        return
     await callback.message.edit_text(
         "🕋 Выберите месяц для паломников:",
         reply_markup=get_palm_month_buttons()
@@ -127,24 +178,33 @@ async def show_month_buttons(callback: CallbackQuery):
 
 @dp.callback_query(F.data.startswith("palm_pkg:"))
 async def palm_pkg_clicked(callback: types.CallbackQuery):
+    # Парсим callback
+    _, month_key, ws_title, pkg_row_str = callback.data.split(":", 3)
+    pkg_row = int(pkg_row_str)
+    if await answer_if_month_unavailable(callback, month_key):
+        return
+
     try:
         await callback.answer("Готовлю превью ваучеров...")
     except Exception:
         pass
 
-    # Парсим callback
-    _, month_key, ws_title, pkg_row_str = callback.data.split(":", 3)
-    pkg_row = int(pkg_row_str)
-
     # Загружаем данные
-    ss = client.open_by_key(PALM_SHEETS[month_key])
-    ws = find_worksheet_by_title(ss, ws_title)
+    try:
+        ws = await aget_palm_worksheet(month_key, ws_title)
+        if ws is None:
+            # месяц пропал из списка, пока открывали лист
+            await callback.message.answer("Этого месяца больше нет в списке таблиц, выберите месяц заново")
+            return
 
-    packages = find_palm_packages(ws)
-    pkg_title = next((p["title"] for p in packages if p["row"] == pkg_row), ws_title)
+        packages = await sheets_call(find_palm_packages, ws)
+        pkg_title = next((p["title"] for p in packages if p["row"] == pkg_row), ws_title)
 
-    # Собираем ваучер
-    voucher = collect_voucher_by_package(ws, pkg_row, pkg_title, look_through_next_packages=2)
+        # Разбираем только этот пакет; если лист уже разобран в фоне — берём из кэша
+        voucher = await sheets_call(voucher_for_package, ws, pkg_row, pkg_title)
+    except SheetsTimeout:
+        await answer_sheets_timeout(callback)
+        return
     ensure_chronological_city_order(voucher)
 
     # Кэшируем
@@ -169,15 +229,22 @@ async def palm_pkg_clicked(callback: types.CallbackQuery):
 async def palm_sheet_selected(callback: types.CallbackQuery):
     try:
         _, month_key, ws_title = callback.data.split(":", 2)
-        ss = client.open_by_key(PALM_SHEETS[month_key])
-        ws = find_worksheet_by_title(ss, ws_title)
+        if await answer_if_month_unavailable(callback, month_key):
+            return
+        ws = await aget_palm_worksheet(month_key, ws_title)
+        if ws is None:
+            await callback.answer("Этого месяца больше нет в списке таблиц, выберите месяц заново", show_alert=True)
+            return
 
-        packages = find_palm_packages(ws)
+        packages = await sheets_call(find_palm_packages, ws)
         if not packages:
             await callback.message.answer("️ Нет пакетов на листе.")
             return
 
-        kb = build_palm_packages_kb(month_key, ws_title, packages)
+        # если лист уже разобран в фоне (prefetch), кнопки покажут людей и отели;
+        # сами здесь не разбираем — для списка пакетов это не нужно
+        parsed = await sheets_call(parsed_packages_if_ready, ws)
+        kb = build_palm_packages_kb(month_key, ws_title, packages, parsed)
         await callback.message.answer(f"📄 Лист: {ws_title}\nВыберите пакет:", reply_markup=kb)
         await callback.answer()
     except Exception as e:
@@ -188,10 +255,14 @@ async def palm_sheet_selected(callback: types.CallbackQuery):
 async def palm_month_selected(callback: CallbackQuery):
     try:
         month_key = callback.data.split(":", 1)[1]
-        keyboard, all_titles = get_palm_sheet_buttons(month_key, show_all=False)
+        if await answer_if_month_unavailable(callback, month_key):
+            return
+        keyboard, all_titles = await sheets_call(get_palm_sheet_buttons, month_key, show_all=False)
         USER_SHEETS_CACHE[callback.from_user.id] = all_titles
         await callback.message.edit_text(f"🕋 Месяц: {month_key}\nВыберите лист:", reply_markup=keyboard)
         await callback.answer()
+        # следующим кликом почти всегда будет один из показанных листов
+        prefetcher.schedule(month_key, [t for t in all_titles[:PALM_SHEETS_PAGE] if t != NO_PALM_SHEETS])
     except Exception:
         await callback.answer(" Ошибка")
 
@@ -199,7 +270,7 @@ async def palm_month_selected(callback: CallbackQuery):
 async def palm_show_all_sheets(callback: CallbackQuery):
     month_key = callback.data.split(":", 1)[1]
     all_titles = USER_SHEETS_CACHE.get(callback.from_user.id, [])
-    keyboard, _ = get_palm_sheet_buttons(month_key, show_all=True)
+    keyboard, _ = await sheets_call(get_palm_sheet_buttons, month_key, show_all=True)
     await callback.message.edit_text(" Все листы:", reply_markup=keyboard)
     await callback.answer()
 
@@ -270,10 +341,55 @@ async def send_vouchers_for_package(message: types.Message, pkg_title: str, vouc
         await start_after_voucher_menu(message, pkg_title, voucher, [fake_group], base, bg_index=bg_index)
         return
 
-    # Если есть группы — шлем каждому
-    for i, grp in enumerate(groups, start=1):
-        await send_one_voucher_for_group(message, pkg_title, voucher, base, grp, i, bg_index=bg_index)
-        await asyncio.sleep(0.2)
-
-        # В конце показываем меню редактирования
+    if config.voucher_delivery & {"merged", "zip"}:
+        await send_vouchers_batch(message, pkg_title, base, groups, bg_index=bg_index)
+    else:
+        # Если есть группы — рендерим все комнаты параллельно в пуле процессов,
+        # а отправляем по порядку, как только готов очередной ваучер
+        jobs = [
+            asyncio.create_task(render_group_pdf(base, grp, i, bg_index=bg_index))
+            for i, grp in enumerate(groups, start=1)
+        ]
+        try:
+            for grp, job in zip(groups, jobs):
+                doc = await job
+                await outbound.answer_document(message, doc, caption=group_caption(pkg_title, grp))
+        finally:
+            for job in jobs:
+                job.cancel()
+
+    # В конце показываем меню редактирования
     await start_after_voucher_menu(message, pkg_title, voucher, groups, base, bg_index=bg_index)
+    print(f" Ваучеры '{pkg_title}' отправлены, очередь Telegram: {outbound.metrics()}")
+
+
+async def send_vouchers_batch(message: types.Message, pkg_title: str, base: dict, groups: list, bg_index: int = -1):
+    """
+    Пакетная отправка (VOUCHER_DELIVERY=merged / zip / rooms, можно через +):
+    все комнаты рендерятся разом, потом уходят одним PDF и/или одним архивом.
+    """
+    payloads = [group_payload(base, grp) for grp in groups]
+    rooms = await render_all(payloads, bg_index=bg_index)
+
+    names = [f"{i}_{build_filename_from_payload(p)}.pdf" for i, p in enumerate(payloads, start=1)]
+    stem = slugify_filename_part(pkg_title) or "vouchers"
+    pax = sum(len(grp.get("people") or []) for grp in groups)
+    caption = f"📄 {pkg_title}\n🛏 Ваучеров: {len(groups)} · {pax} pax"
+
+    if "merged" in config.voucher_delivery:
+        data = await asyncio.to_thread(merged_pdf, rooms)
+        await outbound.answer_document(message, BufferedInputFile(data, filename=f"{stem}.pdf"), caption=caption)
+
+    room_pdfs = []
+    if config.voucher_delivery & {"zip", "rooms"}:
+        room_pdfs = await asyncio.to_thread(lambda: [build_pdf(pages) for pages in rooms])
+
+    if "zip" in config.voucher_delivery:
+        data = await asyncio.to_thread(zip_archive, list(zip(names, room_pdfs)))
+        await outbound.answer_document(message, BufferedInputFile(data, filename=f"{stem}.zip"), caption=caption)
+
+    if "rooms" in config.voucher_delivery:
+        for grp, name, data in zip(groups, names, room_pdfs):
+            await outbound.answer_document(
+                message, BufferedInputFile(data, filename=name), caption=group_caption(pkg_title, grp)
+            )
@@ -5,7 +5,7 @@ from pligrim_bot.config.constants import *
 from pligrim_bot.config.keyboards import slot_for_city, preview_main_kb, citykey_for_value
 from pligrim_bot.core.utils.validation import city_ru
 from pligrim_bot.core.voucher.builder import ensure_chronological_city_order, base_payload_from, nights_from_dates
-from pligrim_bot.core.voucher.render import plural_nights
+from pligrim_bot.core.utils.text_utils import plural_nights
 from pligrim_bot.handlers.pilgrim_handlers import send_vouchers_for_package
 from pligrim_bot.handlers.palm_edit_handlers import start_after_voucher_menu, EDIT_SESSIONS
 
@@ -193,8 +193,9 @@ async def pv_text_input(message: types.Message):
         if base == "dates":
             ensure_chronological_city_order(v)
 
-    # Обновляем кэш и превью
-    PREVIEW_CACHE[cache_id]["voucher"] = v
+    # Обновляем кэш (присваиваем заново, чтобы пересчитать объём записи) и превью
+    data["voucher"] = v
+    PREVIEW_CACHE[cache_id] = data
     EDIT_STATE.pop(message.from_user.id, None)
 
     await message.answer(" Обновлено.")
@@ -7,31 +7,43 @@ import asyncio
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, current_dir)
 
-try:
-    from pligrim_bot.config.settings import get_google_client, refresh_sheets
-    # Импортируем dp, в который всё будет регистрироваться
-    from pligrim_bot.config.constants import bot, dp
+# STARTUP_PROFILE=1 — замерить, сколько стоит импорт каждого модуля
+from pligrim_bot.config.app_config import config
+from pligrim_bot.core.startup_profile import import_profiler
 
-    # --- ВАЖНО: Просто импортируем файл, чтобы код в нем выполнился ---
-    # Звездочка (*) или просто import заставит сработать декораторы @dp... внутри файлов
-    from pligrim_bot.handlers.flight_handlers import *
+if config.startup_profile:
+    import_profiler.install()
 
-    # Вот наш файл с пилигримами, теперь он использует dp напрямую
-    from pligrim_bot.handlers.pilgrim_handlers import *
+try:
+    # Импортируем dp, в который всё будет регистрироваться
+    from pligrim_bot.config.constants import dp, get_bot
 
-    from pligrim_bot.handlers.preview_handlers import *
-    from pligrim_bot.handlers.debug_handlers import *
-    from pligrim_bot.handlers.palm_edit_handlers import *
-    from pligrim_bot.handlers.palm_restart_handlers import *
-    from pligrim_bot.handlers.indv_voucher_handlers import *
+    # --- ВАЖНО: модули обработчиков достаточно импортировать, чтобы сработали декораторы @dp... ---
+    # С LAZY_HANDLERS (по умолчанию) это делается в фоне уже после старта polling.
+    from pligrim_bot.core.lazy_handlers import ALLOWED_UPDATES, LazyHandlers, import_handlers
+    if not config.lazy_handlers:
+        import_handlers()
+    from pligrim_bot.core import sheets_gateway
+    from pligrim_bot.core.prefetch import prefetcher
+    from pligrim_bot.data.snapshots import snapshot_cache
+    from pligrim_bot.data.snapshot_store import SnapshotStore
+    from pligrim_bot.core.voucher import pool as render_pool
 
     print(" Все модули успешно импортированы")
+    if config.startup_profile:
+        if config.lazy_handlers:
+            # обработчики догрузятся в фоне — там будет второй, полный отчёт
+            import_profiler.report()
+        else:
+            import_profiler.uninstall()
+            import_profiler.report()
 except ImportError as e:
     print(f" Ошибка импорта: {e}")
     sys.exit(1)
 
 async def main():
     print(" Бот запускается…")
+    bot = get_bot()
     await bot.delete_webhook(drop_pending_updates=True)
 
     # Создаем папки
@@ -39,9 +51,41 @@ async def main():
     os.makedirs("assets/fonts", exist_ok=True)
     os.makedirs("assets/images", exist_ok=True)
 
+    # процессы рендера поднимаем до того, как появятся потоки пула Google Sheets
+    render_pool.start()
+
+    # снимки листов, скачанные до перезапуска, поднимаем с диска в фоне
+    if config.snapshot_store:
+        snapshot_cache.store = SnapshotStore(config.tmp_dir / "snapshots.sqlite")
+        asyncio.create_task(sheets_gateway.sheets_call(snapshot_cache.restore, timeout=120))
+
+    # таблицы Google ищем и обновляем в фоне — polling не ждёт авторизации и списка таблиц
+    discovery = asyncio.create_task(sheets_gateway.keep_sheets_directory_fresh())
+
+    polling = {}
+    if config.lazy_handlers:
+        def handlers_loaded():
+            if config.startup_profile:
+                import_profiler.uninstall()
+                import_profiler.report()
+
+        # апдейты ждут, пока модули обработчиков импортируются в фоне
+        lazy = LazyHandlers(on_loaded=handlers_loaded)
+        dp.update.outer_middleware(lazy)
+        lazy.start()
+        polling["allowed_updates"] = ALLOWED_UPDATES
+
     print(" Polling started…")
     # Роутеры подключать не нужно, так как мы использовали @dp прямо в файлах
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(bot, **polling)
+    finally:
+        discovery.cancel()
+        prefetcher.cancel()
+        sheets_gateway.shutdown()
+        render_pool.shutdown()
+        if snapshot_cache.store is not None:
+            snapshot_cache.store.close()
 
 if __name__ == "__main__":
     try: